@@ -0,0 +1,250 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SEED = 1
+SAMPLE = 100              # interfaces used by the per-interface operations
+MIN_TIME = 0.2            # a benchmark is repeated until it has run this long...
+MAX_RUNS = 20             # ...or this many times
+THRESHOLD = 0.25          # slowdown (or memory growth) reported as a regression
+MIN_DIFFERENCE = 0.002    # seconds; smaller differences are noise
+
+# benchmarks whose cost grows too fast to run on every size: the largest
+# inventory they run on (--all runs everything). The SPARQL reference for
+# inconsistencies is quadratic, and the number of overlapping pairs that
+# verify-overlaps reports grows with the square of the inventory
+SIZE_LIMITS = {
+    "find_inconsistencies": 1_000,
+    "verify_overlaps": 10_000,
+    "verify_overlaps-maintained": 10_000,
+}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def measure(function, repeat=True):
+    # seconds per call: the median of the runs
+    runs = []
+    start = time.perf_counter()
+    while True:
+        before = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - before)
+        if not repeat or len(runs) >= MAX_RUNS or time.perf_counter() - start >= MIN_TIME:
+            break
+    return {"seconds": statistics.median(runs), "min": min(runs), "runs": len(runs)}
+
+
+def per_call(function, items):
+    # one call per item, timed together: seconds per call
+    start = time.perf_counter()
+    for item in items:
+        function(item)
+    return {"seconds": (time.perf_counter() - start) / len(items), "runs": len(items)}
+
+
+# child processes: every measurement runs in a fresh interpreter, so peak
+# memory belongs to one size and the sizes do not warm up each other's caches
+
+def bench_conversion():
+    sys.path.insert(0, os.path.join(ROOT, "converter"))
+    from yang2rdf import yang_to_rdf
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in sorted(os.listdir(os.path.join(ROOT, "yang"))):
+            if name.endswith(".yang"):
+                yang_file = os.path.join(ROOT, "yang", name)
+                rdf_file = os.path.join(tmp, name[:-len(".yang")] + ".ttl")
+                results[f"yang_to_rdf:{name}"] = measure(lambda: yang_to_rdf(yang_file, rdf_file))
+    return {"benchmarks": results, "peak-rss-mb": peak_rss_mb()}
+
+
+def bench_size(size, run_all=False):
+    sys.path[:0] = [os.path.join(ROOT, "operations"), os.path.join(ROOT, "instances")]
+    from generate import stream_instances, shard_rng
+    from tracking import TrackedGraph
+    from loader import load_schemas, load_instances
+    from index import interface_index
+    from conflicts import conflict_tracker
+    from lookup import prefix_trie
+    from interfaces import count_interfaces, list_interfaces, show_interface_details
+    from status import status_up, status_down
+    from inconsistencies import enable_interface, disable_interface, find_inconsistencies, \
+        find_inconsistencies_native, find_conflicts
+
+    results = {}
+
+    def run(name, function):
+        limit = SIZE_LIMITS.get(name)
+        if limit is not None and size > limit and not run_all:
+            results[name] = {"skipped": f"runs up to {limit} interfaces (--all to run it)"}
+            return
+        results[name] = function()
+        print(f"  {size} {name}: {results[name]['seconds']:.6f}s", file=sys.stderr, flush=True)
+
+    names = [f"eth{i}" for i in random.Random(SEED).sample(range(size), min(SAMPLE, size))]
+    g = TrackedGraph()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        instances_file = os.path.join(tmp, "instances.ttl")
+        run("generate", lambda: measure(lambda: stream_instances(instances_file, size, rng=shard_rng(SEED, 0)), repeat=False))
+
+        def load():
+            load_schemas(g)
+            load_instances(g, instances_file)
+        run("load", lambda: measure(load, repeat=False))
+        triples = len(g)
+
+    # the structures the executor builds at startup and keeps in sync
+    run("build-structures", lambda: measure(lambda: (interface_index(g), conflict_tracker(g), prefix_trie(g)), repeat=False))
+
+    run("count_interfaces", lambda: measure(lambda: count_interfaces(g)))
+    run("list_interfaces", lambda: measure(lambda: list_interfaces(g)))
+    run("show_interface_details", lambda: per_call(lambda name: show_interface_details(g, name), names))
+    run("status_down", lambda: per_call(lambda name: status_down(g, name), names))
+    run("status_up", lambda: per_call(lambda name: status_up(g, name), names))
+    run("disable_interface", lambda: per_call(lambda name: disable_interface(g, name), names))
+    run("enable_interface", lambda: per_call(lambda name: enable_interface(g, name), names))
+    run("find_inconsistencies", lambda: measure(lambda: find_inconsistencies(g), repeat=False))
+    run("find_inconsistencies_native", lambda: measure(lambda: find_inconsistencies_native(g)))
+    run("find_inconsistencies-maintained", lambda: measure(lambda: conflict_tracker(g).inconsistencies()))
+    run("verify_overlaps", lambda: measure(lambda: find_conflicts(g), repeat=False))
+    run("verify_overlaps-maintained", lambda: measure(lambda: conflict_tracker(g).conflicts(), repeat=False))
+
+    return {"interfaces": size, "triples": triples, "benchmarks": results, "peak-rss-mb": peak_rss_mb()}
+
+
+def run_child(arguments, timeout):
+    # runs this script on one task in a new process; its JSON result comes on stdout
+    command = [sys.executable, os.path.abspath(__file__), *arguments]
+    try:
+        done = subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, timeout=timeout, text=True)
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {timeout}s"}
+    if done.returncode != 0:
+        return {"error": f"exited with code {done.returncode}"}
+    return json.loads(done.stdout)
+
+
+def run_all_benchmarks(sizes, run_all=False, timeout=None):
+    results = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": SEED,
+        },
+        "conversion": None,
+        "sizes": {},
+    }
+
+    print("Conversion of the bundled YANG modules...", file=sys.stderr, flush=True)
+    results["conversion"] = run_child(["--child", "conversion"], timeout)
+
+    for size in sizes:
+        print(f"{size} interfaces...", file=sys.stderr, flush=True)
+        results["sizes"][str(size)] = run_child(["--child", str(size)] + (["--all"] if run_all else []), timeout)
+
+    return results
+
+
+# comparison
+
+def _flatten(results):
+    # (size, benchmark) -> (seconds, kind): every timing and peak memory of a results file
+    flat = {}
+    groups = [("conversion", results.get("conversion") or {})] + list(results.get("sizes", {}).items())
+    for group, data in groups:
+        for name, result in (data.get("benchmarks") or {}).items():
+            if "seconds" in result:
+                flat[(group, name)] = (result["seconds"], "time")
+        if data.get("peak-rss-mb") is not None:
+            flat[(group, "peak-rss-mb")] = (data["peak-rss-mb"], "memory")
+    return flat
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    # returns the lines of the comparison and the number of regressions
+    old, new = _flatten(baseline), _flatten(current)
+    lines, regressions = [], 0
+
+    for key in sorted(new, key=lambda k: (k[0] != "conversion", int(k[0]) if k[0].isdigit() else 0, k[1])):
+        if key not in old:
+            continue
+        (before, kind), (after, _) = old[key], new[key]
+        ratio = after / before if before else float("inf")
+        regressed = ratio > 1 + threshold and (kind == "memory" or after - before > MIN_DIFFERENCE)
+        regressions += regressed
+
+        unit = "MB" if kind == "memory" else "s"
+        lines.append(f"{'REGRESSION' if regressed else '':10} {key[0]:>10} {key[1]:34} "
+                     f"{before:12.6f}{unit} -> {after:12.6f}{unit}  x{ratio:.2f}")
+
+    missing = sorted(set(old) - set(new))
+    for group, name in missing:
+        lines.append(f"{'MISSING':10} {group:>10} {name}")
+
+    return lines, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for conversion, instance generation, loading and the executor operations.")
+    parser.add_argument("-s", "--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated inventory sizes, in interfaces (default: 1000,10000,100000,1000000)")
+    parser.add_argument("-o", "--output", default="benchmarks/results.json", help="JSON file for the results")
+    parser.add_argument("--all", action="store_true", help="also run the benchmarks that are limited to smaller sizes")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds allowed for each size")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="compare the results with a saved baseline and exit with 1 if there are regressions")
+    parser.add_argument("--input", metavar="RESULTS", help="with --compare, compare this results file instead of running the benchmarks")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD * 100,
+                        help="slowdown or memory growth, in percent, reported as a regression (default 25)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # the log of the benchmarked code would mix with the JSON result
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        result = bench_conversion() if args.child == "conversion" else bench_size(int(args.child), args.all)
+        stdout.write(json.dumps(result))
+        sys.exit(0)
+
+    if args.input:
+        with open(args.input) as f:
+            current = json.load(f)
+    else:
+        current = run_all_benchmarks([int(size) for size in args.sizes.split(",")], args.all, args.timeout)
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(baseline, current, args.threshold / 100)
+        print("\n".join(lines))
+        print(f"{regressions} regressions (threshold {args.threshold:.0f}%)")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from rdflib import Graph
+from pyang import repository
+
+from logger import Logger
+from yang2rdf import create_context, parse_module, module_to_graph, namespace, CONVERTER_VERSION, cache_variant, \
+    add_cache_arguments, cache_from_arguments
+
+
+# one pyang context per process, so every import is resolved (and cached
+# by the repository) only once, no matter how many modules import it
+_ctx = None
+
+
+def init_worker(search_path):
+    global _ctx
+    _ctx = create_context(search_path)
+
+
+def convert_module(yang_file, rdf_file=None):
+    start = time.perf_counter()
+
+    module = parse_module(_ctx, yang_file)
+    g = module_to_graph(module)
+
+    if rdf_file:
+        g.serialize(destination=rdf_file, format='turtle')
+        data = None
+    else:
+        # merged output: hand the triples back to the parent process
+        data = g.serialize(format='nt')
+
+    return module.arg, len(g), time.perf_counter() - start, data
+
+
+def collect_modules(inputs):
+    yang_files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".yang"):
+                    yang_files.append(os.path.join(path, name))
+        else:
+            yang_files.append(path)
+    return yang_files
+
+
+def output_path(yang_file, output_dir):
+    name = os.path.splitext(os.path.basename(yang_file))[0]
+    return os.path.join(output_dir, f"{name}.ttl")
+
+
+def batch_convert(yang_files, output_dir=None, merged_file=None, workers=None, search_path="", cache=None):
+    # the directories being converted come first, so imports between the
+    # modules of the batch resolve to the same files that are converted
+    dirs = []
+    for yang_file in yang_files:
+        d = os.path.dirname(os.path.abspath(yang_file))
+        if d not in dirs:
+            dirs.append(d)
+    search_path = os.pathsep.join(dirs + ([search_path] if search_path else []))
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    jobs = [(f, output_path(f, output_dir) if output_dir else None) for f in yang_files]
+
+    merged = None
+    if merged_file:
+        merged = Graph()
+        merged.bind("yang", namespace)
+
+    failures = 0
+    start = time.perf_counter()
+
+    # cache hits are answered here and never reach the worker pool
+    keys = {}
+    if cache:
+        rep = repository.FileRepository(search_path)
+        pending = []
+        for yang_file, rdf_file in jobs:
+            key = cache.key(yang_file, rep, CONVERTER_VERSION, cache_variant(format="turtle" if rdf_file else "nt"))
+            cached = cache.fetch(key)
+            if not cached:
+                keys[yang_file] = key
+                pending.append((yang_file, rdf_file))
+                continue
+
+            if rdf_file:
+                shutil.copyfile(cached, rdf_file)
+            if merged is not None:
+                merged.parse(cached, format='turtle' if rdf_file else 'nt')
+            Logger.log(f"{yang_file}: cache hit" + (f" -> {rdf_file}" if rdf_file else ""))
+        jobs = pending
+
+    def collect(yang_file, rdf_file, result):
+        nonlocal failures
+        try:
+            name, size, elapsed, data = result()
+        except Exception as e:
+            failures += 1
+            Logger.error(f"Failed to convert {yang_file}: {e}")
+            return
+
+        if yang_file in keys:
+            cache.store(keys[yang_file], source_file=rdf_file, data=data)
+
+        if merged is not None:
+            if rdf_file:
+                merged.parse(rdf_file, format='turtle')
+            else:
+                merged.parse(data=data, format='nt')
+
+        Logger.log(f"{name}: {size} triples in {elapsed:.3f}s" + (f" -> {rdf_file}" if rdf_file else ""))
+
+    if jobs and workers == 1:
+        init_worker(search_path)
+        for yang_file, rdf_file in jobs:
+            collect(yang_file, rdf_file, lambda: convert_module(yang_file, rdf_file))
+    elif jobs:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(search_path,)) as pool:
+            futures = [(f, o, pool.submit(convert_module, f, o)) for f, o in jobs]
+            for yang_file, rdf_file, future in futures:
+                collect(yang_file, rdf_file, future.result)
+
+    if merged is not None:
+        merged.serialize(destination=merged_file, format='turtle')
+        Logger.log(f"Merged graph with {len(merged)} triples written to {merged_file}.")
+
+    Logger.log(f"Converted {len(yang_files) - failures}/{len(yang_files)} modules in {time.perf_counter() - start:.3f}s.")
+    if cache:
+        cache.report()
+
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert several YANG modules to RDF in one run.")
+    parser.add_argument("inputs", nargs="+", help="YANG files or directories containing YANG files")
+    parser.add_argument("-o", "--output-dir", help="directory for the per-module RDF files")
+    parser.add_argument("-m", "--merge", metavar="FILE", help="also write every module into a single merged graph")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("-p", "--path", default="", help="extra module search path for imports")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.output_dir and not args.merge:
+        Logger.error("At least one of --output-dir or --merge is required.")
+        sys.exit(1)
+
+    yang_files = collect_modules(args.inputs)
+    if not yang_files:
+        Logger.error("No YANG modules found.")
+        sys.exit(1)
+
+    Logger.log(f"Converting {len(yang_files)} modules...")
+
+    failures = batch_convert(yang_files, args.output_dir, args.merge, args.workers, args.path, cache_from_arguments(args))
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,63 @@
+import sys
+import time
+import argparse
+
+from rdflib import URIRef
+
+from logger import Logger
+from yang2rdf import create_context, parse_module, process_statement, make_uri_fragment, namespace
+
+
+DEFAULT_MODULES = ["yang/ietf-interfaces.yang", "yang/ietf-ip.yang"]
+
+
+class CountingSink:
+    # keeps only the number of triples, so the timing covers the tree walk
+    # and term construction but not the rdflib store
+    def __init__(self):
+        self.count = 0
+
+    def add(self, triple):
+        self.count += 1
+
+
+def count_statements(statement):
+    total = 0
+    stack = [statement]
+    while stack:
+        stmt = stack.pop()
+        total += 1
+        stack.extend(stmt.substmts)
+    return total
+
+
+def benchmark_module(yang_file, repeat):
+    ctx = create_context()
+    module = parse_module(ctx, yang_file)
+    module_uri = URIRef(namespace[make_uri_fragment(module.arg)])
+
+    best = None
+    for _ in range(repeat):
+        sink = CountingSink()
+        start = time.perf_counter()
+        process_statement(sink, module, module_uri)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    statements = count_statements(module)
+    Logger.log(f"{module.arg}: {statements} statements, {sink.count} triples, "
+               f"best of {repeat}: {best * 1000:.3f} ms ({best / statements * 1e6:.2f} us/statement)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the process_statement tree walk.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("-n", "--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.repeat <= 0:
+        Logger.error("--repeat must be positive.")
+        sys.exit(1)
+
+    for yang_file in args.modules:
+        benchmark_module(yang_file, args.repeat)
@@ -0,0 +1,124 @@
+import os
+import re
+import hashlib
+import tempfile
+
+from logger import Logger
+
+
+DEFAULT_CACHE_DIR = ".yang2rdf-cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_import_stmt = re.compile(r'^\s*(?:import|include)\s+["\']?([A-Za-z_][\w.\-]*)', re.MULTILINE)
+
+
+class ConversionCache:
+    # On-disk cache of converted modules, addressed by a hash of everything
+    # the output depends on: the module text, the text of every module it
+    # imports (transitively), the converter version and the output variant.
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._candidates = None
+        self._imports = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, yang_file, repository, version, variant=""):
+        with open(yang_file, 'rb') as f:
+            text = f.read()
+
+        h = hashlib.sha256()
+        h.update(f"{version}\0{variant}\0".encode())
+        h.update(hashlib.sha256(text).digest())
+
+        seen = set()
+        pending = _import_stmt.findall(text.decode('utf-8', errors='replace'))
+        while pending:
+            name = pending.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+
+            for path in self._candidate_files(repository, name):
+                digest, imports = self._read_import(path)
+                h.update(f"{name}\0".encode())
+                h.update(digest)
+                pending.extend(imports)
+
+        return h.hexdigest()
+
+    def _candidate_files(self, repository, name):
+        # every file the repository could resolve an import to takes part in
+        # the key, so a change in any candidate invalidates the entry
+        if self._candidates is None or self._candidates[0] is not repository:
+            candidates = {}
+            for module, _rev, (_fmt, path) in repository.get_modules_and_revisions(None):
+                candidates.setdefault(module, []).append(path)
+            self._candidates = (repository, candidates)
+        return sorted(self._candidates[1].get(name, []))
+
+    def _read_import(self, path):
+        if path not in self._imports:
+            with open(path, 'rb') as f:
+                text = f.read()
+            imports = _import_stmt.findall(text.decode('utf-8', errors='replace'))
+            self._imports[path] = (hashlib.sha256(text).digest(), imports)
+        return self._imports[path]
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.rdf")
+
+    def fetch(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+
+        # mtime doubles as the last-use time for eviction
+        os.utime(path)
+        self.hits += 1
+        return path
+
+    def store(self, key, source_file=None, data=None):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as out:
+            if data is not None:
+                out.write(data.encode('utf-8'))
+            else:
+                with open(source_file, 'rb') as f:
+                    while chunk := f.read(1 << 20):
+                        out.write(chunk)
+        os.replace(tmp, self._path(key))
+
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".rdf"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        # least recently used first
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def report(self):
+        Logger.log(f"Cache: {self.hits} hit(s), {self.misses} miss(es).")
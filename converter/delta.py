@@ -0,0 +1,27 @@
+from rdflib import Graph
+
+from streaming import nt_term, BUFFER_SIZE
+
+
+def graph_delta(old_graph, new_graph):
+    removed = [t for t in old_graph if t not in new_graph]
+    added = [t for t in new_graph if t not in old_graph]
+    return removed, added
+
+
+def write_patch(removed, added, patch_file):
+    # RDF Patch: one "D" (delete) or "A" (add) line per triple, in a single
+    # transaction; deletes come first so a patch can move a value
+    with open(patch_file, 'w', encoding='utf-8', buffering=BUFFER_SIZE) as f:
+        f.write("TX .\n")
+        for s, p, o in removed:
+            f.write(f"D {nt_term(s)} {nt_term(p)} {nt_term(o)} .\n")
+        for s, p, o in added:
+            f.write(f"A {nt_term(s)} {nt_term(p)} {nt_term(o)} .\n")
+        f.write("TC .\n")
+
+
+def load_rdf(rdf_file):
+    g = Graph()
+    g.parse(rdf_file, format='nt' if rdf_file.endswith('.nt') else 'turtle')
+    return g
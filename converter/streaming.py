@@ -0,0 +1,78 @@
+import re
+
+from rdflib import Literal, URIRef, BNode, RDF
+
+
+BUFFER_SIZE = 1 << 20
+
+_local_name = re.compile(r'^[A-Za-z0-9_][A-Za-z0-9_\-]*$')
+_escapes = str.maketrans({
+    '\\': '\\\\',
+    '"': '\\"',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+
+def nt_term(term):
+    if isinstance(term, URIRef):
+        return f"<{term}>"
+    if isinstance(term, BNode):
+        return f"_:{term}"
+
+    value = f'"{str(term).translate(_escapes)}"'
+    if term.language:
+        return f"{value}@{term.language}"
+    if term.datatype:
+        return f"{value}^^<{term.datatype}>"
+    return value
+
+
+class TripleWriter:
+    # Drop-in replacement for the rdflib Graph used by process_statement:
+    # every added triple is written straight to a buffered file instead of
+    # being kept in memory. Nothing is sorted or deduplicated, so a statement
+    # reached twice in the walk is written twice; RDF parsers collapse those,
+    # and the parsed result is the same set of triples as the Graph output.
+
+    def __init__(self, destination, format="nt"):
+        if format not in ("nt", "turtle"):
+            raise ValueError(f"Unsupported streaming format: {format}")
+
+        self.format = format
+        self.count = 0
+        self._prefixes = {}
+        self._file = open(destination, 'w', encoding='utf-8', buffering=BUFFER_SIZE)
+
+    def bind(self, prefix, namespace):
+        # prefixes only make sense for Turtle and must come before any triple
+        if self.format == "turtle" and self.count == 0:
+            self._prefixes[str(namespace)] = prefix
+            self._file.write(f"@prefix {prefix}: <{namespace}> .\n")
+
+    def add(self, triple):
+        s, p, o = triple
+        if self.format == "turtle":
+            line = f"{self._term(s)} {'a' if p == RDF.type else self._term(p)} {self._term(o)} .\n"
+        else:
+            line = f"{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n"
+        self._file.write(line)
+        self.count += 1
+
+    def _term(self, term):
+        if isinstance(term, URIRef):
+            for namespace, prefix in self._prefixes.items():
+                if term.startswith(namespace):
+                    local = term[len(namespace):]
+                    if _local_name.match(local):
+                        return f"{prefix}:{local}"
+        return nt_term(term)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,119 +1,264 @@
+import os
 import sys
 import re
 import time
+import shutil
+import argparse
+from functools import lru_cache
 
 from rdflib import Graph, Literal, RDF, RDFS, URIRef, Namespace
 from pyang import repository, context
 
 from logger import Logger
+from streaming import TripleWriter
+from cache import ConversionCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from delta import graph_delta, write_patch, load_rdf
 
 
 namespace = Namespace("http://example.org/yang#")
 
+# bump whenever a change to the converter changes its output, so cached
+# conversions from older versions are not reused
+CONVERTER_VERSION = "2"
+
+
+def cache_variant(stream=None, format="turtle"):
+    # cache variant of an output: the streamed and the serialized files
+    # differ (order, repeated lines) even in the same format, so each writer
+    # has its own; yang2rdf.py and batch.py share them for the same output
+    return f"stream-{stream}" if stream else f"graph-{format}"
+
+
+STRUCTURAL_KEYWORDS = frozenset({
+    "module", "submodule", "container", "list", "leaf", "leaf-list",
+    "choice", "case", "grouping", "augment", "uses", "rpc",
+    "input", "output", "typedef", "identity", "notification"
+})
+
+LITERAL_KEYWORDS = frozenset({
+    "type", "default", "units", "description", "config", "mandatory",
+    "range", "length", "pattern", "value", "status", "when",
+    "if-feature", "must", "reference", "min-elements", "max-elements",
+    "fraction-digits", "bit", "position"
+})
+
+# keyword -> how its statement is turned into triples
+STRUCTURAL, LITERAL, ENUM = 1, 2, 3
+KEYWORD_DISPATCH = {
+    **{kw: STRUCTURAL for kw in STRUCTURAL_KEYWORDS},
+    **{kw: LITERAL for kw in LITERAL_KEYWORDS},
+    "enum": ENUM,
+}
+
+_unsafe_chars = re.compile(r'[^a-zA-Z0-9_\-]')
+_keyword_terms = {}
+
 
 def make_uri_fragment(name):
-    sanitized = re.sub(r'[^a-zA-Z0-9_\-]', '_', name)
+    sanitized = _unsafe_chars.sub('_', name)
     return sanitized
 
 
+def keyword_term(kw):
+    # the class of a structural statement and the predicate of a literal
+    # one are both namespace[kw.capitalize()], built once per keyword
+    term = _keyword_terms.get(kw)
+    if term is None:
+        term = _keyword_terms[kw] = namespace[kw.capitalize()]
+    return term
+
+
+@lru_cache(maxsize=65536)
+def node_uri(arg, prefix=""):
+    return URIRef(namespace[prefix + make_uri_fragment(arg)])
+
+
 def process_statement(graph, statement, parent_uri):
-    structural_keywords = {
-        "module", "submodule", "container", "list", "leaf", "leaf-list",
-        "choice", "case", "grouping", "augment", "uses", "rpc",
-        "input", "output", "typedef", "identity", "notification"
-    }
-
-    literal_keywords = {
-        "type", "default", "units", "description", "config", "mandatory",
-        "range", "length", "pattern", "value", "status", "when",
-        "if-feature", "must", "reference", "min-elements", "max-elements",
-        "fraction-digits", "bit", "position"
-    }
-
-    for child in statement.substmts:
+    add = graph.add
+    has_child = namespace.hasChild
+
+    # explicit stack of (children iterator, subject, nested under a literal
+    # keyword) frames; it visits statements in the same order as a recursive
+    # walk, without being limited by the interpreter recursion depth
+    stack = [(iter(statement.substmts), parent_uri, False)]
+
+    while stack:
+        children, parent_uri, nested = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            continue
+
         kw = child.keyword
         arg = child.arg
 
+        # substatements of a literal keyword: structural ones are walked on
+        # behalf of the enclosing node, the others become literals on it
+        if nested:
+            if kw in STRUCTURAL_KEYWORDS:
+                stack.append((iter(child.substmts), parent_uri, False))
+            elif arg is not None:
+                add((parent_uri, keyword_term(kw), Literal(arg)))
+            continue
+
         if not kw:
             continue
 
-        if kw in structural_keywords:
+        kind = KEYWORD_DISPATCH.get(kw)
+
+        if kind == STRUCTURAL:
             if arg:
-                frag = make_uri_fragment(arg)
+                node = node_uri(arg)
             else:
-                frag = f"{kw}_{id(child)}"
+                # statements without an argument (rpc input/output, ...) are
+                # named after their parent, so URIs are stable between runs
+                node = URIRef(namespace[f"{kw}_{parent_uri[len(namespace):]}"])
 
-            node_uri = URIRef(namespace[frag])
-            graph.add((node_uri, RDF.type, namespace[kw.capitalize()]))
+            add((node, RDF.type, keyword_term(kw)))
             if arg:
-                graph.add((node_uri, RDFS.label, Literal(arg)))
-            graph.add((parent_uri, namespace.hasChild, node_uri))
+                add((node, RDFS.label, Literal(arg)))
+            add((parent_uri, has_child, node))
 
-            process_statement(graph, child, node_uri)
+            stack.append((iter(child.substmts), node, False))
 
-        elif kw in literal_keywords:
+        elif kind == LITERAL:
             if arg is not None:
-                graph.add((parent_uri, namespace[kw.capitalize()], Literal(arg)))
-            for grand in child.substmts:
-                if grand.keyword in structural_keywords:
-                    process_statement(graph, grand, parent_uri)
-                else:
-                    if grand.arg is not None:
-                        graph.add((parent_uri, namespace[grand.keyword.capitalize()], Literal(grand.arg)))
+                add((parent_uri, keyword_term(kw), Literal(arg)))
+            stack.append((iter(child.substmts), parent_uri, True))
 
-        elif kw == "enum":
+        elif kind == ENUM:
             if arg:
-                frag = f"enum_{make_uri_fragment(arg)}"
+                node = node_uri(arg, "enum_")
             else:
-                frag = f"enum_{id(child)}"
-            node_uri = URIRef(namespace[frag])
-            graph.add((node_uri, RDF.type, namespace.Enum))
-            graph.add((node_uri, RDFS.label, Literal(arg if arg else "")))
-            graph.add((parent_uri, namespace.hasChild, node_uri))
-            process_statement(graph, child, node_uri)
+                node = URIRef(namespace[f"enum_{parent_uri[len(namespace):]}"])
+            add((node, RDF.type, namespace.Enum))
+            add((node, RDFS.label, Literal(arg if arg else "")))
+            add((parent_uri, has_child, node))
+            stack.append((iter(child.substmts), node, False))
 
         else:
             if arg is not None:
-                graph.add((parent_uri, namespace[kw.capitalize()], Literal(arg)))
+                add((parent_uri, keyword_term(kw), Literal(arg)))
             for grand in child.substmts:
                 if grand.arg is not None:
-                    graph.add((parent_uri, namespace[grand.keyword.capitalize()], Literal(grand.arg)))
+                    add((parent_uri, keyword_term(grand.keyword), Literal(grand.arg)))
+
 
+def create_context(search_path=""):
+    rep = repository.FileRepository(search_path)
+    return context.Context(rep)
 
-def yang_to_rdf(yang_file, rdf_file):
-    rep = repository.FileRepository()
-    ctx = context.Context(rep)
 
+def parse_module(ctx, yang_file):
     with open(yang_file, 'r') as f:
         yang_data = f.read()
-    module = ctx.add_module('module', yang_data, in_format='yang')
+    module = ctx.add_module(yang_file, yang_data, in_format='yang')
+    if module is None:
+        raise ValueError(f"Failed to parse YANG module: {yang_file}")
     ctx.validate()
 
-    Logger.log(f"Parsed YANG module: {module.arg}")
+    return module
 
+
+def emit_module(module, sink):
+    module_uri = URIRef(namespace[make_uri_fragment(module.arg)])
+    sink.add((module_uri, RDF.type, namespace.Module))
+    sink.add((module_uri, RDFS.label, Literal(module.arg)))
+
+    process_statement(graph=sink, statement=module, parent_uri=module_uri)
+
+
+def module_to_graph(module):
     g = Graph()
     g.bind("yang", namespace)
 
-    module_uri = URIRef(namespace[make_uri_fragment(module.arg)])
-    g.add((module_uri, RDF.type, namespace.Module))
-    g.add((module_uri, RDFS.label, Literal(module.arg)))
+    emit_module(module, g)
+
+    return g
+
 
-    process_statement(graph=g, statement=module, parent_uri=module_uri)
+def module_context(yang_file):
+    # imports resolve from the module's own directory first, as in
+    # batch.py, so both convert (and cache) a module the same way
+    return create_context(os.path.dirname(os.path.abspath(yang_file)))
 
-    g.serialize(destination=rdf_file, format='turtle')
+
+def yang_to_rdf(yang_file, rdf_file, stream=None, cache=None):
+    ctx = module_context(yang_file)
+
+    if cache:
+        key = cache.key(yang_file, ctx.repository, CONVERTER_VERSION, cache_variant(stream))
+        cached = cache.fetch(key)
+        if cached:
+            shutil.copyfile(cached, rdf_file)
+            Logger.log(f"Cache hit for {yang_file}, RDF data written to {rdf_file}.")
+            return
+
+    module = parse_module(ctx, yang_file)
+
+    Logger.log(f"Parsed YANG module: {module.arg}")
+
+    if stream:
+        # skips the in-memory graph: triples go to the file as they are found
+        with TripleWriter(rdf_file, format=stream) as writer:
+            writer.bind("yang", namespace)
+            writer.bind("rdfs", RDFS)
+            emit_module(module, writer)
+    else:
+        g = module_to_graph(module)
+        g.serialize(destination=rdf_file, format='turtle')
+
+    if cache:
+        cache.store(key, source_file=rdf_file)
 
     Logger.log(f"RDF data written to {rdf_file}.")
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        Logger.error("Usage: python yang2rdf.py <input_yang_file> <output_rdf_file>")
-        sys.exit(1)
+def yang_to_delta(yang_file, old_rdf_file, patch_file):
+    ctx = module_context(yang_file)
+    module = parse_module(ctx, yang_file)
+
+    Logger.log(f"Parsed YANG module: {module.arg}")
 
+    removed, added = graph_delta(load_rdf(old_rdf_file), module_to_graph(module))
+    write_patch(removed, added, patch_file)
 
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
+    Logger.log(f"Patch against {old_rdf_file} written to {patch_file}: {len(removed)} removed, {len(added)} added.")
 
-    Logger.log(f"Converting {input_file} to {output_file}...")
 
-    yang_to_rdf(input_file, output_file)
\ No newline at end of file
+def add_cache_arguments(parser):
+    parser.add_argument("--no-cache", action="store_true", help="always convert, ignoring the conversion cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"conversion cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="maximum cache size in MB, least recently used entries are evicted first")
+
+
+def cache_from_arguments(args):
+    if args.no_cache:
+        return None
+    return ConversionCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="python yang2rdf.py <input_yang_file> <output_rdf_file> [--stream {nt,turtle}] [--no-cache] [--delta-from <old_rdf_file>]")
+    parser.add_argument("input_file")
+    parser.add_argument("output_file")
+    parser.add_argument("--stream", choices=["nt", "turtle"],
+                        help="write triples directly to the output while walking the module (N-Triples or unsorted Turtle)")
+    parser.add_argument("--delta-from", metavar="OLD_RDF_FILE",
+                        help="write only the triples added and removed since OLD_RDF_FILE, as an RDF Patch")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    if args.delta_from:
+        Logger.log(f"Computing delta of {args.input_file} against {args.delta_from}...")
+        yang_to_delta(args.input_file, args.delta_from, args.output_file)
+        sys.exit(0)
+
+    Logger.log(f"Converting {args.input_file} to {args.output_file}...")
+
+    cache = cache_from_arguments(args)
+    yang_to_rdf(args.input_file, args.output_file, stream=args.stream, cache=cache)
+
+    if cache:
+        cache.report()
@@ -1,5 +1,8 @@
+import os
 import sys
 import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from rdflib import Graph, Namespace, Literal, RDF, URIRef
 import ipaddress
 from rdflib.namespace import XSD
@@ -12,6 +15,14 @@ DEFAULT_COUNT = 20
 INCONSISTENCY_PCT = 0.15 
 OVERLAP_PCT = 0.10
 CORE_NET = ipaddress.IPv4Network("10.0.0.0/12")
+CORE_PREFIXES = [18, 19, 20, 21, 22, 24, 25, 26]
+
+# networks an overlap may be built on; past this many, a uniform sample of
+# all the networks generated so far is kept (reservoir sampling)
+OVERLAP_RESERVOIR = 100_000
+
+BUFFER_SIZE = 1 << 20
+CHUNK = 10_000   # interfaces written per write() call
 
 def random_ip_v4():
     net = random.choice([
@@ -22,33 +33,40 @@ def random_ip_v4():
     return f"{net[0]}.{net[1]}.{net[2]}.{random.randint(1, 254)}"
 
 
-def random_ip_v6():
-    return f"fe80::{random.randint(0, 0xffff):04x}:{random.randint(0, 0xffff):04x}"
+def random_ip_v6(rng=random):
+    return f"fe80::{rng.randint(0, 0xffff):04x}:{rng.randint(0, 0xffff):04x}"
 
 
 def random_prefix():
     return random.choice([24, 25, 26, 27, 28, 29, 30])
 
 
-def random_oper_status():
-    return random.choice(["up", "down"])
+def random_oper_status(rng=random):
+    return rng.choice(["up", "down"])
 
 
-def random_cidr_within_core():
-    # choose a prefix size that makes sense
-    prefix = random.choice([18, 19, 20, 21, 22, 24, 25, 26])
+def random_core_network(rng=random):
+    # a random subnet of CORE_NET and a host inside it, as (start, prefix,
+    # host) integers: the subnet is picked by index instead of listing every
+    # subnet of the chosen size
+    prefix = rng.choice(CORE_PREFIXES)
+    size = 1 << (32 - prefix)
+    start = int(CORE_NET.network_address) + rng.randrange(CORE_NET.num_addresses >> (32 - prefix)) * size
+    host = start + rng.randint(1, max(1, size - 2))
+    return start, prefix, host
 
-    # split the CORE_NET into subnets of the chosen prefix
-    possible = list(CORE_NET.subnets(new_prefix=prefix))
 
-    # choose one subnet
-    network = random.choice(possible)
+def overlapping_network(base):
+    # the first subnet two bits longer than base (start, prefix), which base contains
+    start, prefix = base
+    prefix = min(prefix + 2, 30)
+    return start, prefix, start + 1
 
-    # pick a host IP inside the subnet
-    host_ip = network.network_address + random.randint(1, max(1, network.num_addresses - 2))
 
+def cidr_dict(start, prefix, host):
+    network = ipaddress.IPv4Network((start, prefix))
     return {
-        "host_ip": str(host_ip),
+        "host_ip": str(ipaddress.IPv4Address(host)),
         "prefix": prefix,
         "network": str(network.network_address),
         "broadcast": str(network.broadcast_address),
@@ -56,6 +74,10 @@ def random_cidr_within_core():
     }
 
 
+def random_cidr_within_core(rng=random):
+    return cidr_dict(*random_core_network(rng))
+
+
 def random_cidr():
     # random ip
     ip_int = random.randint(0, 2**32 - 1)
@@ -78,21 +100,54 @@ def random_cidr():
     }
 
 
+def interface_records(count, inconsistency_pct=INCONSISTENCY_PCT, overlap_pct=OVERLAP_PCT,
+                      rng=random, first=0, reservoir_size=OVERLAP_RESERVOIR):
+    # yields (name, enabled, oper_status, ipv4, ipv6) for eth<first> ..
+    # eth<first + count - 1>, with ipv4 as (start, prefix, host) or None and
+    # ipv6 as an address string or None; memory stays constant
+    previous_networks = []   # (start, prefix)
+    seen = 0
+
+    for i in range(first, first + count):
+        name = f"eth{i}"
+        enabled = rng.choice([True, False])
+        oper_status = random_oper_status(rng)
+
+        if enabled and rng.random() < inconsistency_pct:
+            yield name, enabled, oper_status, None, None
+            continue
+
+        if previous_networks and rng.random() < overlap_pct:
+            # smaller subnet, garantees overlap
+            ipv4 = overlapping_network(rng.choice(previous_networks))
+        else:
+            ipv4 = random_core_network(rng)
+
+        seen += 1
+        if len(previous_networks) < reservoir_size:
+            previous_networks.append(ipv4[:2])
+        else:
+            slot = rng.randrange(seen)
+            if slot < reservoir_size:
+                previous_networks[slot] = ipv4[:2]
+
+        ipv6 = None
+        if rng.random() < 0.5:
+            ipv6 = random_ip_v6(rng)
+
+        yield name, enabled, oper_status, ipv4, ipv6
+
+
 def generate_instances(count: int = DEFAULT_COUNT, 
                        inconsistency_pct: float = INCONSISTENCY_PCT,
-                       overlap_pct: float = OVERLAP_PCT) -> Graph:
+                       overlap_pct: float = OVERLAP_PCT,
+                       rng=random) -> Graph:
     g = Graph()
     g.bind("inst", INST)
     g.bind("if",   IF)
     g.bind("ip",   IP)
 
-    previous_networks = []
-
-    for i in range(count):
-        name = f"eth{i}"
-        enabled = random.choice([True, False])
-        oper_status = random_oper_status()
-
+    for name, enabled, oper_status, ipv4, ipv6 in interface_records(count, inconsistency_pct, overlap_pct, rng):
         iface_uri = INST[name]
 
         g.add((iface_uri, RDF.type, IF.Interface))
@@ -100,92 +155,212 @@ def generate_instances(count: int = DEFAULT_COUNT,
         g.add((iface_uri, IF.enabled, Literal(enabled)))
         g.add((iface_uri, IF["oper-status"], Literal(oper_status)))
 
-        has_ip = True
-        if enabled and random.random() < inconsistency_pct:
-            has_ip = False
-
-        if not has_ip:
+        if ipv4 is None:
             continue
 
-        make_overlap = len(previous_networks) > 0 and random.random() < overlap_pct
-
-        if make_overlap:
-            base_net = random.choice(previous_networks)
-
-            # smaller subnet, garantees overlap
-            prefix = min(base_net.prefixlen + 2, 30)
-            overlapping_net = list(base_net.subnets(new_prefix=prefix))[0]
-
-            network = overlapping_net
-            ip_addr = str(network.network_address + 1)  # host IP inside subnet
-            cidr = {
-                "host_ip": str(ip_addr),
-                "prefix": prefix,
-                "network": str(network.network_address),
-                "broadcast": str(network.broadcast_address),
-                "cidr": network.with_prefixlen
-            }
-
-        else:
-            cidr = random_cidr_within_core()
-            ip_addr = cidr["host_ip"]
-            prefix = cidr["prefix"]
-
-            network = ipaddress.IPv4Network(cidr["cidr"], strict=False)
+        start, prefix, host = ipv4
+        cidr = cidr_dict(start, prefix, host)
 
-        
-        previous_networks.append(network)
-
-        ipv4_addr = ip_addr
-        prefix = prefix
         ipv4_uri = INST[f"{name}_ipv4"]
         g.add((ipv4_uri, RDF.type, IP["ipv4-address"]))
-        g.add((ipv4_uri, IP.ip, Literal(ipv4_addr)))
+        g.add((ipv4_uri, IP.ip, Literal(cidr["host_ip"])))
         g.add((ipv4_uri, IP["prefix-length"], Literal(prefix)))
         g.add((ipv4_uri, IP.interface, iface_uri))
 
-        
         g.add((ipv4_uri, IP.cidr, Literal(cidr["cidr"], datatype=XSD.string)))
 
-        start = int(ipaddress.IPv4Address(cidr["network"]))
-        end = int(ipaddress.IPv4Address(cidr["broadcast"]))
         g.add((ipv4_uri, IP["network-start"], Literal(start, datatype=XSD.integer)))
-        g.add((ipv4_uri, IP["network-end"], Literal(end, datatype=XSD.integer)))
-
+        g.add((ipv4_uri, IP["network-end"], Literal(start + (1 << (32 - prefix)) - 1, datatype=XSD.integer)))
 
-        if random.random() < 0.5:
-            ipv6_addr = random_ip_v6()
+        if ipv6 is not None:
             ipv6_uri = INST[f"{name}_ipv6"]
             g.add((ipv6_uri, RDF.type, IP["ipv6-address"]))
-            g.add((ipv6_uri, IP.ip, Literal(ipv6_addr)))
+            g.add((ipv6_uri, IP.ip, Literal(ipv6)))
             g.add((ipv6_uri, IP.interface, iface_uri))
 
-
     return g
 
 
-def usage():
-    print("Usage: python generate_random_instances.py <output.ttl> [count] [incons%]", file=sys.stderr)
-    print("  count      – number of interfaces (default 20)", file=sys.stderr)
-    print("  incons%    – inconsistency percentage (0‑100, default 15)", file=sys.stderr)
-    sys.exit(1)
+# streaming output: the same triples as generate_instances, formatted
+# directly as text
+
+def _dotted(address):
+    return f"{address >> 24}.{(address >> 16) & 255}.{(address >> 8) & 255}.{address & 255}"
+
+
+TURTLE_PREFIXES = (
+    f"@prefix if: <{IF}> .\n"
+    f"@prefix inst: <{INST}> .\n"
+    f"@prefix ip: <{IP}> .\n"
+    f"@prefix xsd: <{XSD}> .\n\n"
+)
+
+
+def turtle_record(name, enabled, oper_status, ipv4, ipv6):
+    text = (f'inst:{name} a if:Interface ;\n    if:name "{name}" ;\n'
+            f'    if:enabled {"true" if enabled else "false"} ;\n    if:oper-status "{oper_status}" .\n\n')
+    if ipv4 is not None:
+        start, prefix, host = ipv4
+        text += (f'inst:{name}_ipv4 a ip:ipv4-address ;\n    ip:interface inst:{name} ;\n'
+                 f'    ip:ip "{_dotted(host)}" ;\n    ip:prefix-length {prefix} ;\n'
+                 f'    ip:cidr "{_dotted(start)}/{prefix}"^^xsd:string ;\n'
+                 f'    ip:network-start {start} ;\n    ip:network-end {start + (1 << (32 - prefix)) - 1} .\n\n')
+    if ipv6 is not None:
+        text += f'inst:{name}_ipv6 a ip:ipv6-address ;\n    ip:interface inst:{name} ;\n    ip:ip "{ipv6}" .\n\n'
+    return text
+
+
+NT = {
+    "type": f"<{RDF.type}>",
+    "interface-class": f"<{IF.Interface}>",
+    "name": f"<{IF.name}>",
+    "enabled": f"<{IF.enabled}>",
+    "oper-status": f"<{IF['oper-status']}>",
+    "ipv4-address": f"<{IP['ipv4-address']}>",
+    "ipv6-address": f"<{IP['ipv6-address']}>",
+    "interface": f"<{IP.interface}>",
+    "ip": f"<{IP.ip}>",
+    "prefix-length": f"<{IP['prefix-length']}>",
+    "cidr": f"<{IP.cidr}>",
+    "network-start": f"<{IP['network-start']}>",
+    "network-end": f"<{IP['network-end']}>",
+    "boolean": f"<{XSD.boolean}>",
+    "integer": f"<{XSD.integer}>",
+    "string": f"<{XSD.string}>",
+}
+
+
+def nt_record(name, enabled, oper_status, ipv4, ipv6):
+    t = NT
+    iface = f"<{INST}{name}>"
+    text = (f'{iface} {t["type"]} {t["interface-class"]} .\n'
+            f'{iface} {t["name"]} "{name}" .\n'
+            f'{iface} {t["enabled"]} "{"true" if enabled else "false"}"^^{t["boolean"]} .\n'
+            f'{iface} {t["oper-status"]} "{oper_status}" .\n')
+    if ipv4 is not None:
+        start, prefix, host = ipv4
+        node = f"<{INST}{name}_ipv4>"
+        text += (f'{node} {t["type"]} {t["ipv4-address"]} .\n'
+                 f'{node} {t["interface"]} {iface} .\n'
+                 f'{node} {t["ip"]} "{_dotted(host)}" .\n'
+                 f'{node} {t["prefix-length"]} "{prefix}"^^{t["integer"]} .\n'
+                 f'{node} {t["cidr"]} "{_dotted(start)}/{prefix}"^^{t["string"]} .\n'
+                 f'{node} {t["network-start"]} "{start}"^^{t["integer"]} .\n'
+                 f'{node} {t["network-end"]} "{start + (1 << (32 - prefix)) - 1}"^^{t["integer"]} .\n')
+    if ipv6 is not None:
+        node = f"<{INST}{name}_ipv6>"
+        text += (f'{node} {t["type"]} {t["ipv6-address"]} .\n'
+                 f'{node} {t["interface"]} {iface} .\n'
+                 f'{node} {t["ip"]} "{ipv6}" .\n')
+    return text
+
+
+def stream_instances(output_file, count=DEFAULT_COUNT, inconsistency_pct=INCONSISTENCY_PCT,
+                     overlap_pct=OVERLAP_PCT, format="turtle", rng=random, first=0):
+    # writes the instances to output_file as they are generated, without
+    # building a graph; returns the number of interfaces written
+    if format not in ("nt", "turtle"):
+        raise ValueError(f"Unsupported streaming format: {format}")
+    record = turtle_record if format == "turtle" else nt_record
+
+    with open(output_file, "w", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+        if format == "turtle":
+            f.write(TURTLE_PREFIXES)
+        chunk = []
+        for item in interface_records(count, inconsistency_pct, overlap_pct, rng, first):
+            chunk.append(record(*item))
+            if len(chunk) == CHUNK:
+                f.write("".join(chunk))
+                chunk.clear()
+        f.write("".join(chunk))
+
+    return count
+
+
+def rdf_format(path):
+    # as rdf_format in operations/snapshot.py, which loads these files back
+    return 'nt' if path.endswith('.nt') else 'turtle'
+
+
+# sharded generation: the interfaces are split in contiguous ranges, each
+# generated by a worker process into a file of its own, from a random stream
+# derived only from the seed and the shard number. A shard's file therefore
+# does not depend on how many workers there are or which one generates it.
+
+def shard_range(count, shards, shard):
+    return count * shard // shards, count * (shard + 1) // shards
+
+
+def shard_file(output_file, shards, shard):
+    root, ext = os.path.splitext(output_file)
+    return f"{root}-{shard:05d}-of-{shards:05d}{ext}"
+
+
+def shard_rng(seed, shard):
+    # string seeds are hashed with SHA-512, so the stream is the same on every run and platform
+    return random.Random(f"{seed}:{shard}")
+
+
+def generate_shard(output_file, shards, shard, count, seed, inconsistency_pct, overlap_pct, format):
+    first, last = shard_range(count, shards, shard)
+    stream_instances(output_file, last - first, inconsistency_pct, overlap_pct, format, shard_rng(seed, shard), first)
+    return output_file, last - first
+
+
+def generate_sharded(output_file, count, shards, seed, inconsistency_pct=INCONSISTENCY_PCT,
+                     overlap_pct=OVERLAP_PCT, format="turtle", workers=None):
+    # writes the shard files (just output_file for a single shard) and
+    # returns their (path, interface count) pairs, in shard order
+    jobs = [(shard_file(output_file, shards, shard) if shards > 1 else output_file,
+             shards, shard, count, seed, inconsistency_pct, overlap_pct, format)
+            for shard in range(shards)]
+
+    if workers == 1 or shards == 1:
+        return [generate_shard(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(generate_shard, *zip(*jobs)))
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        usage()
-
-    output_file = sys.argv[1]
-
-    count = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_COUNT
-    incons = float(sys.argv[3]) / 100.0 if len(sys.argv) > 3 else INCONSISTENCY_PCT
-    overlap = float(sys.argv[4]) / 100.0 if len(sys.argv) > 4 else OVERLAP_PCT
-
-    if count <= 0 or not (0 <= incons <= 1):
-        usage()
-
-    g = generate_instances(count=count, inconsistency_pct=incons)
-    g.serialize(destination=output_file, format="turtle")
-    print(f"Generated {count} interfaces → {output_file}")
+    parser = argparse.ArgumentParser(usage="python generate.py <output.ttl|output.nt> [count] [incons%] [overlap%] [--stream] [--seed SEED] [--shards N] [-j WORKERS]")
+    parser.add_argument("output_file")
+    parser.add_argument("count", nargs="?", type=int, default=DEFAULT_COUNT, help="number of interfaces (default 20)")
+    parser.add_argument("incons", nargs="?", type=float, default=INCONSISTENCY_PCT * 100,
+                        help="inconsistency percentage (0-100, default 15)")
+    parser.add_argument("overlap", nargs="?", type=float, default=OVERLAP_PCT * 100,
+                        help="overlapping sub-net percentage (0-100, default 10)")
+    parser.add_argument("--stream", action="store_true",
+                        help="write the triples as they are generated, in constant memory (N-Triples for .nt files, Turtle otherwise)")
+    parser.add_argument("--seed", help="seed for reproducible output; the same seed and shard count always give the same files")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="split the interfaces into this many files (<output>-<k>-of-<n>.<ext>), generated in parallel and streamed")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes for the shards (default: CPU count)")
+    args = parser.parse_args()
+
+    count = args.count
+    incons = args.incons / 100.0
+    overlap = args.overlap / 100.0
+
+    if count <= 0 or not (0 <= incons <= 1) or not (0 <= overlap <= 1):
+        parser.error("count must be positive and the percentages between 0 and 100")
+    if args.shards < 1 or args.shards > count:
+        parser.error("shards must be between 1 and count")
+
+    output_file = args.output_file
+    format = rdf_format(output_file)
+
+    if args.shards > 1:
+        seed = args.seed if args.seed is not None else random.getrandbits(64)
+        for path, shard_count in generate_sharded(output_file, count, args.shards, seed, incons, overlap, format, args.workers):
+            print(f"Generated {shard_count} interfaces → {path}")
+    else:
+        # a single shard: the same output as --shards 1 would give
+        rng = shard_rng(args.seed, 0) if args.seed is not None else random
+        if args.stream:
+            stream_instances(output_file, count, incons, overlap, format, rng)
+        else:
+            g = generate_instances(count=count, inconsistency_pct=incons, overlap_pct=overlap, rng=rng)
+            g.serialize(destination=output_file, format=format)
+        print(f"Generated {count} interfaces → {output_file}")
     print(f"  • {incons*100:.0f}% enabled but without IP (inconsistency)")
-    print(f"  • {overlap*100:.0f}% with overlapping or duplicated sub-net (inconsistency)")
\ No newline at end of file
+    print(f"  • {overlap*100:.0f}% with overlapping or duplicated sub-net (inconsistency)")
@@ -0,0 +1,159 @@
+import ipaddress
+
+import colorama
+import numpy as np
+from rdflib import RDF
+
+from namespaces import IP
+
+
+BUCKET_BITS = 16  # utilization is reported per /16
+
+
+def extract_ipv4_columns(graph):
+    # network data of the ipv4 address nodes as columns: one pass over each
+    # predicate through the store's (p, o) index, no per-address dicts
+    typed = set(graph.subjects(RDF.type, IP["ipv4-address"]))
+    starts = {s: int(o) for s, _, o in graph.triples((None, IP["network-start"], None)) if s in typed}
+    ends = {s: int(o) for s, _, o in graph.triples((None, IP["network-end"], None)) if s in starts}
+    owners = {s: o for s, _, o in graph.triples((None, IP.interface, None)) if s in ends}
+
+    nodes = list(owners)
+    codes = {}
+    for node in nodes:
+        codes.setdefault(owners[node], len(codes))
+    interfaces = [str(iface).split("#")[-1] for iface in codes]
+
+    return columns(np.fromiter((starts[n] for n in nodes), dtype=np.int64, count=len(nodes)),
+                   np.fromiter((ends[n] for n in nodes), dtype=np.int64, count=len(nodes)),
+                   np.fromiter((codes[owners[n]] for n in nodes), dtype=np.int32, count=len(nodes)),
+                   interfaces)
+
+
+def columns(start, end, interface, interfaces):
+    # sorted by start, larger blocks first, which the analyses below rely on
+    order = np.lexsort((-end, start))
+    start, end, interface = start[order], end[order], interface[order]
+
+    size = end - start + 1
+    # a CIDR block: power-of-two size, aligned on its size (as is_cidr_block)
+    is_block = ((size & (size - 1)) == 0) & (start % np.maximum(size, 1) == 0)
+    length = np.where(is_block, 32 - np.log2(np.maximum(size, 1)).round().astype(np.int64), -1)
+
+    return {
+        "start": start,
+        "end": end,
+        "length": length,
+        "interface": interface,
+        "interfaces": interfaces,
+    }
+
+
+def merged_ranges(start, end):
+    # union of the (sorted by start) ranges, as disjoint [start, end] segments
+    if len(start) == 0:
+        return start, end
+    reach = np.maximum.accumulate(end)
+    first = np.concatenate(([True], start[1:] > reach[:-1] + 1))
+    last = np.concatenate((first[1:], [True]))
+    return start[first], reach[last]
+
+
+def covered_below(seg_start, seg_end, points):
+    # number of addresses covered by the segments below each point
+    if len(seg_start) == 0:
+        return np.zeros(len(points), dtype=np.int64)
+    lengths = seg_end - seg_start + 1
+    total = np.concatenate(([0], np.cumsum(lengths)))
+    n = np.searchsorted(seg_start, points, side="left")
+    overshoot = np.where(n > 0, np.maximum(seg_end[np.maximum(n - 1, 0)] + 1 - points, 0), 0)
+    return total[n] - overshoot
+
+
+def analyze(cols, top=10):
+    start, end, length = cols["start"], cols["end"], cols["length"]
+    n = len(start)
+
+    # exact duplicates sit next to each other once sorted by (start, end)
+    same = np.zeros(n, dtype=bool)
+    if n > 1:
+        same[1:] = (start[1:] == start[:-1]) & (end[1:] == end[:-1])
+    group_id = np.cumsum(~same) - 1
+    group_sizes = np.bincount(group_id) if n else np.zeros(0, dtype=np.int64)
+    duplicates = int(same.sum())
+
+    # every later prefix starting at or before this one's end overlaps it,
+    # apart from the exact duplicates
+    later = np.searchsorted(start, end, side="right") - np.arange(n) - 1
+    overlap_pairs = int(later.sum()) - int((group_sizes * (group_sizes - 1) // 2).sum())
+
+    # prefixes reached by an earlier one, or reaching a later one
+    reach = np.maximum.accumulate(end) if n else end
+    reached = np.zeros(n, dtype=bool)
+    if n > 1:
+        reached[1:] = reach[:-1] >= start[1:]
+    conflicting = int((reached | (later > 0)).sum())
+
+    # CIDR blocks nest, so the prefixes starting inside a block are the ones
+    # it contains (duplicates included)
+    contained = np.where(length >= 0, later, 0)
+    containers = np.argsort(-contained, kind="stable")[:top]
+
+    seg_start, seg_end = merged_ranges(start, end)
+    covered = int((seg_end - seg_start + 1).sum()) if n else 0
+
+    # per-/16 utilization, from the covered address count at each boundary
+    bucket = 1 << BUCKET_BITS
+    used = np.diff(covered_below(seg_start, seg_end, np.arange((1 << (32 - BUCKET_BITS)) + 1, dtype=np.int64) * bucket))
+    busiest = np.argsort(-used, kind="stable")[:top]
+    busiest = busiest[used[busiest] > 0]
+
+    # free space between the covered segments, largest first
+    gap_start = np.concatenate(([0], seg_end + 1))
+    gap_end = np.concatenate((seg_start - 1, [(1 << 32) - 1]))
+    keep = gap_end >= gap_start
+    gap_start, gap_end = gap_start[keep], gap_end[keep]
+    largest = np.argsort(-(gap_end - gap_start), kind="stable")[:top]
+
+    return {
+        "prefixes": n,
+        "duplicates": duplicates,
+        "overlap-pairs": overlap_pairs,
+        "conflicting-prefixes": conflicting,
+        "covered-addresses": covered,
+        "top-containers": [(int(start[i]), int(end[i]), cols["interfaces"][cols["interface"][i]], int(contained[i]))
+                           for i in containers if contained[i] > 0],
+        "utilization": [(int(i) << BUCKET_BITS, int(used[i]) / bucket) for i in busiest],
+        "free-gaps": [(int(gap_start[i]), int(gap_end[i])) for i in largest],
+    }
+
+
+def prefix_report(graph, top=10):
+    return analyze(extract_ipv4_columns(graph), top)
+
+
+def _range(start, end):
+    if ((end - start + 1) & (end - start)) == 0 and start % (end - start + 1) == 0:
+        return str(ipaddress.IPv4Network((start, 32 - (end - start + 1).bit_length() + 1)))
+    return f"{ipaddress.IPv4Address(start)} - {ipaddress.IPv4Address(end)}"
+
+
+def print_prefix_report(report):
+    print(f"{colorama.Fore.MAGENTA}IPv4 prefix report:{colorama.Fore.RESET}")
+    print(f"  Prefixes: {report['prefixes']}")
+    print(f"  Duplicates: {report['duplicates']}")
+    print(f"  Overlapping pairs: {report['overlap-pairs']}")
+    print(f"  Prefixes in a conflict: {report['conflicting-prefixes']}")
+    print(f"  Addresses covered: {report['covered-addresses']}")
+
+    print(f"{colorama.Fore.MAGENTA}Prefixes containing the most others:{colorama.Fore.RESET}")
+    for start, end, interface, count in report["top-containers"]:
+        print(f"  {_range(start, end)} ({interface}): {count}")
+
+    print(f"{colorama.Fore.MAGENTA}Most used /{32 - BUCKET_BITS} blocks:{colorama.Fore.RESET}")
+    for start, ratio in report["utilization"]:
+        print(f"  {_range(start, start + (1 << BUCKET_BITS) - 1)}: {ratio:.1%}")
+
+    print(f"{colorama.Fore.MAGENTA}Largest free ranges:{colorama.Fore.RESET}")
+    for start, end in report["free-gaps"]:
+        print(f"  {_range(start, end)} ({end - start + 1} addresses)")
@@ -0,0 +1,217 @@
+from contextlib import nullcontext
+
+from interfaces import list_interfaces, show_interface_details
+from status import status_up, status_down, bulk_update
+from inconsistencies import find_inconsistencies_native, enable_interface, disable_interface, find_conflicts
+from conflicts import conflict_tracker, cross_check
+from lookup import lookup_address
+from analytics import prefix_report
+from patch import apply_patch
+from telemetry import running_ingestor
+from wal import running_wal
+from query_cache import cached, query_cache
+from metrics import operation, profiled, is_enabled, snapshot
+
+
+class CommandError(Exception):
+    pass
+
+
+# command name -> (handler, whether it changes the graph); every handler takes
+# the graph and the rest of the command line and returns plain, JSON-ready data
+COMMANDS = {}
+
+
+def command(name, mutates=False):
+    def register(handler):
+        COMMANDS[name] = (handler, mutates)
+        return handler
+    return register
+
+
+def _required(argument, what):
+    if not argument:
+        raise CommandError(f"Missing {what}.")
+    return argument
+
+
+def _flag(argument, flag):
+    if argument and argument != flag:
+        raise CommandError(f"Unknown argument: {argument}")
+    return argument == flag
+
+
+def _update(function, graph, interface_name):
+    if not function(graph, _required(interface_name, "interface name")):
+        raise CommandError(f"Interface '{interface_name}' not found.")
+    return {"interface": interface_name}
+
+
+@command("show")
+def _show(graph, argument):
+    details = show_interface_details(graph, _required(argument, "interface name"))
+    if details is None:
+        raise CommandError(f"Interface '{argument}' not found.")
+    return {"details": details}
+
+
+@command("lookup")
+def _lookup(graph, argument):
+    try:
+        return lookup_address(graph, _required(argument, "IP address"))
+    except ValueError:
+        raise CommandError(f"Invalid IP address: {argument}")
+
+
+@command("list")
+def _list(graph, argument):
+    return {"interfaces": cached(graph, "list", argument, lambda: list_interfaces(graph))}
+
+
+@command("status-up", mutates=True)
+def _status_up(graph, argument):
+    return _update(status_up, graph, argument)
+
+
+@command("status-down", mutates=True)
+def _status_down(graph, argument):
+    return _update(status_down, graph, argument)
+
+
+@command("enable", mutates=True)
+def _enable(graph, argument):
+    return _update(enable_interface, graph, argument)
+
+
+@command("disable", mutates=True)
+def _disable(graph, argument):
+    return _update(disable_interface, graph, argument)
+
+
+def _read_changes(changes_file):
+    # one "<interface> <field> <value>" change per line of the file
+    try:
+        with open(changes_file) as f:
+            changes = [line.split() for line in f if line.strip()]
+    except OSError as e:
+        raise CommandError(f"Failed to read '{changes_file}': {e}")
+    if any(len(change) != 3 for change in changes):
+        raise CommandError(f"Each line of '{changes_file}' must be '<interface> <field> <value>'.")
+    return changes
+
+
+@command("bulk-update", mutates=True)
+def _bulk_update(graph, argument):
+    # argument: a changes file, or the (interface, field, value) changes
+    # themselves (run() from the HTTP server), answered item by item too
+    if isinstance(argument, list):
+        results = bulk_update(graph, argument)
+        return {"applied": sum(r["ok"] for r in results), "failed": [r for r in results if not r["ok"]], "results": results}
+
+    results = bulk_update(graph, _read_changes(_required(argument, "changes file")))
+    return {"applied": sum(r["ok"] for r in results), "failed": [r for r in results if not r["ok"]]}
+
+
+@command("check-inconsistencies")
+def _check_inconsistencies(graph, argument):
+    # answered from the maintained state; --full recomputes from the graph
+    full = _flag(argument, "--full")
+
+    def compute():
+        if full:
+            inconsistencies = find_inconsistencies_native(graph)
+        else:
+            inconsistencies = conflict_tracker(graph).inconsistencies()
+        return [{"interface": str(iface), "name": str(name)} for iface, name in inconsistencies]
+
+    return {"inconsistencies": cached(graph, "check-inconsistencies", full, compute)}
+
+
+@command("verify-overlaps")
+def _verify_overlaps(graph, argument):
+    full = _flag(argument, "--full")
+    dups, overlaps = cached(graph, "verify-overlaps", full,
+                            lambda: find_conflicts(graph) if full else conflict_tracker(graph).conflicts())
+    return {"duplicates": dups, "overlaps": overlaps}
+
+
+@command("report-prefixes")
+def _report_prefixes(graph, argument):
+    return {"report": prefix_report(graph)}
+
+
+@command("cache-stats")
+def _cache_stats(graph, argument):
+    return {"stats": query_cache(graph).stats()}
+
+
+@command("stats")
+def _stats(graph, argument):
+    if not is_enabled():
+        raise CommandError("Metrics are not enabled (start the executor with --metrics or --profile).")
+    return {"stats": snapshot()}
+
+
+@command("cross-check")
+def _cross_check(graph, argument):
+    return {"problems": cross_check(graph, reference=_flag(argument, "--reference"))}
+
+
+@command("apply-patch", mutates=True)
+def _apply_patch(graph, argument):
+    patch_file = _required(argument, "patch file")
+    try:
+        removed, added = apply_patch(graph, patch_file)
+    except Exception as e:
+        raise CommandError(f"Failed to apply patch '{patch_file}': {e}")
+    return {"patch": patch_file, "removed": removed, "added": added}
+
+
+@command("ingest-stats")
+def _ingest_stats(graph, argument):
+    ingestor = running_ingestor(graph)
+    if ingestor is None:
+        raise CommandError("Telemetry ingestion is not running (start the executor with --ingest).")
+    return {"source": f"{ingestor.source}:{ingestor.path}", "stats": ingestor.stats.snapshot()}
+
+
+@command("wal-stats")
+def _wal_stats(graph, argument):
+    wal = running_wal(graph)
+    if wal is None:
+        raise CommandError("The write-ahead log is not enabled (start the executor with --wal).")
+    return {"stats": wal.stats()}
+
+
+def execute(graph, line):
+    # runs one command line and returns its result: {"command", "ok", ...data}
+    # on success, {"command", "ok": False, "error"} on failure
+    name, _, argument = line.strip().partition(" ")
+    if name not in COMMANDS:
+        return {"command": name, "ok": False, "error": f"Unknown command: {line.strip()}"}
+    return run(graph, name, argument.strip())
+
+
+def run(graph, name, argument):
+    # like execute, with the argument already parsed (whatever the handler
+    # accepts besides the command line text), e.g. a request's JSON body
+    entry = COMMANDS.get(name)
+    if entry is None:
+        return {"command": name, "ok": False, "error": f"Unknown command: {name}"}
+
+    handler, mutates = entry
+
+    # queries share the graph, changes get it to themselves
+    lock = getattr(graph, "lock", None)
+    with (lock.write() if mutates else lock.read()) if lock else nullcontext():
+        # whatever a change applied before failing is in the graph (and the
+        # maintained structures) already, so it is committed either way
+        try:
+            with operation(f"command:{name}"), profiled(name):
+                result = handler(graph, argument)
+        except CommandError as e:
+            return {"command": name, "ok": False, "error": str(e)}
+        finally:
+            if mutates:
+                graph.commit()
+    return {"command": name, "ok": True, **result}
@@ -0,0 +1,232 @@
+from bisect import bisect_left, insort
+
+from rdflib import Literal, RDF
+
+from namespaces import IF, IP
+from index import ADDRESS_FAMILIES, NAME, INTERFACE, TYPE, interface_index
+from tracking import attached
+from inconsistencies import make_network, find_inconsistencies, find_inconsistencies_native, find_conflicts
+
+
+ADDRESS_WIDTHS = {"ipv4": 32, "ipv6": 128}
+
+ADDRESS_PREDICATES = {IP.cidr, IP["network-start"], IP["network-end"], IP.ip, IP["prefix-length"]}
+
+TRUE = Literal(True)
+ENABLED = IF.enabled
+INTERFACE_CLASS = IF.Interface
+
+WATCHED_PREDICATES = {ENABLED, NAME, INTERFACE, TYPE} | ADDRESS_PREDICATES
+
+
+def is_cidr_block(start, end):
+    size = end - start + 1
+    return size & (size - 1) == 0 and start % size == 0
+
+
+def read_network(graph, node):
+    # the network dict of an address node, as get_all_networks builds it, or
+    # None when the node is not a typed address with a known range
+    family = next((ADDRESS_FAMILIES[t] for t in graph.objects(node, RDF.type) if t in ADDRESS_FAMILIES), None)
+    iface = graph.value(node, INTERFACE)
+    if family is None or iface is None:
+        return None
+
+    value = lambda p: graph.value(node, p)
+    network = make_network(iface, family, value(IP.cidr), value(IP["network-start"]),
+                           value(IP["network-end"]), value(IP.ip), value(IP["prefix-length"]))
+    if network["start"] is None or network["end"] is None:
+        return None
+    return network
+
+
+class ConflictTracker:
+    # Duplicate/overlapping prefixes and enabled interfaces without an address,
+    # kept up to date from the TrackedGraph change notifications so the
+    # verify-overlaps and check-inconsistencies commands only read state.
+    #
+    # Prefixes are kept sorted by start per family: the ones starting inside a
+    # range are a bisect away, and the ones starting before it can only be the
+    # enclosing CIDR blocks, looked up directly by (family, start, end).
+    # Ranges that are not CIDR blocks are few and scanned.
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.index = interface_index(graph)
+        self.networks = {}      # address node -> network dict
+        self.by_range = {}      # (family, start, end) -> [address node, ...]
+        self.starts = {}        # family -> sorted [(start, end, address node)]
+        self.unaligned = {}     # family -> address nodes whose range is not a CIDR block
+        self.overlaps = {}      # address node -> address nodes it overlaps
+        self.inconsistent = {}  # interface -> if:name
+
+        for node in list(self.index.families):
+            self._refresh_address(node)
+        for iface in set(graph.subjects(ENABLED, TRUE)):
+            self._refresh_interface(iface)
+
+    # maintained state
+
+    def _overlapping(self, node, family, start, end):
+        found = set()
+
+        # prefixes starting inside [start, end], except exact duplicates
+        entries = self.starts.get(family, [])
+        for s, e, other in entries[bisect_left(entries, (start,)):bisect_left(entries, (end + 1,))]:
+            if other != node and (s, e) != (start, end):
+                found.add(other)
+
+        # prefixes starting before it that reach into it: the CIDR blocks
+        # enclosing start, or one of the non-CIDR ranges
+        for bits in range(1, ADDRESS_WIDTHS[family] + 1):
+            block_start = start >> bits << bits
+            if block_start != start:
+                found.update(self.by_range.get((family, block_start, block_start + (1 << bits) - 1), ()))
+        for other in self.unaligned.get(family, ()):
+            other_start, other_end = self.networks[other]["start"], self.networks[other]["end"]
+            if other_start < start <= other_end:
+                found.add(other)
+
+        return found
+
+    def _add_network(self, node, network):
+        family, start, end = network["family"], network["start"], network["end"]
+
+        self.networks[node] = network
+        self.by_range.setdefault((family, start, end), []).append(node)
+        insort(self.starts.setdefault(family, []), (start, end, node))
+        if not is_cidr_block(start, end):
+            self.unaligned.setdefault(family, set()).add(node)
+
+        others = self._overlapping(node, family, start, end)
+        self.overlaps[node] = others
+        for other in others:
+            self.overlaps[other].add(node)
+
+    def _remove_network(self, node):
+        network = self.networks.pop(node)
+        family, start, end = network["family"], network["start"], network["end"]
+
+        nodes = self.by_range[(family, start, end)]
+        nodes.remove(node)
+        if not nodes:
+            del self.by_range[(family, start, end)]
+
+        entries = self.starts[family]
+        del entries[bisect_left(entries, (start, end, node))]
+        self.unaligned.get(family, set()).discard(node)
+
+        for other in self.overlaps.pop(node):
+            self.overlaps[other].discard(node)
+
+    def _refresh_address(self, node):
+        network = read_network(self.graph, node)
+        if network == self.networks.get(node):
+            return
+        if node in self.networks:
+            self._remove_network(node)
+        if network is not None:
+            self._add_network(node, network)
+
+    def _refresh_interface(self, iface):
+        name = self.graph.value(iface, NAME)
+        if name is not None \
+                and (iface, ENABLED, TRUE) in self.graph \
+                and (iface, RDF.type, INTERFACE_CLASS) in self.graph \
+                and not any(node in self.index.families for node in self.index.addresses.get(iface, ())):
+            self.inconsistent[iface] = name
+        else:
+            self.inconsistent.pop(iface, None)
+
+    def _changed(self, triple):
+        s, p, o = triple
+        if p not in WATCHED_PREDICATES:
+            return
+        if p in (ENABLED, NAME) or (p == TYPE and o == INTERFACE_CLASS):
+            self._refresh_interface(s)
+        elif p == INTERFACE:
+            self._refresh_address(s)
+            self._refresh_interface(o)
+        elif p == TYPE and o in ADDRESS_FAMILIES:
+            self._refresh_address(s)
+            for iface in self.graph.objects(s, INTERFACE):
+                self._refresh_interface(iface)
+        elif p in ADDRESS_PREDICATES:
+            self._refresh_address(s)
+
+    triple_added = _changed
+    triple_removed = _changed
+
+    # answers
+
+    def inconsistencies(self):
+        return sorted(self.inconsistent.items())
+
+    def conflicts(self):
+        order = lambda n: (n["family"], n["start"], -n["end"], n["interface"])
+
+        dups = []
+        for nodes in self.by_range.values():
+            first = self.networks[nodes[0]]
+            dups.extend((first, self.networks[node]) for node in nodes[1:])
+
+        overlaps = []
+        for node, others in self.overlaps.items():
+            network = self.networks[node]
+            overlaps.extend((network, self.networks[other]) for other in others
+                            if order(network) < order(self.networks[other]))
+
+        return sorted(dups, key=lambda d: order(d[0])), \
+            sorted(overlaps, key=lambda o: (order(o[0]), order(o[1])))
+
+
+def conflict_tracker(graph):
+    return attached(graph, ConflictTracker)
+
+
+def _network_key(network):
+    return network["family"], network["interface"], network["cidr"], network["start"], network["end"]
+
+
+def _duplicate_groups(dups):
+    # which member a duplicate is paired with depends on the order the
+    # prefixes were seen in, so duplicates are compared as whole groups
+    groups = {}
+    for pair in dups:
+        for network in pair:
+            groups.setdefault((network["family"], network["start"], network["end"]), set()).add(_network_key(network))
+    return {(key, frozenset(members)) for key, members in groups.items()}
+
+
+def _overlap_pairs(overlaps):
+    return {frozenset((_network_key(a), _network_key(b))) for a, b in overlaps}
+
+
+def _compare(problems, label, first, second, first_name, second_name):
+    for item in sorted(second - first, key=str):
+        problems.append(f"{label} missing from {first_name}: {item}")
+    for item in sorted(first - second, key=str):
+        problems.append(f"{label} only in {first_name}, not in {second_name}: {item}")
+
+
+def cross_check(graph, reference=False):
+    # compares the maintained state with a full recompute over the graph and
+    # returns a description of every difference (empty when they agree);
+    # with reference, the native inconsistency check is also compared with
+    # the SPARQL one
+    tracker = conflict_tracker(graph)
+    problems = []
+
+    native = set(find_inconsistencies_native(graph))
+    _compare(problems, "inconsistency", set(tracker.inconsistencies()), native, "tracker", "full recompute")
+    if reference:
+        _compare(problems, "inconsistency", native, set(find_inconsistencies(graph)), "native check", "SPARQL query")
+
+    tracked_dups, tracked_overlaps = tracker.conflicts()
+    full_dups, full_overlaps = find_conflicts(graph)
+    _compare(problems, "duplicate", _duplicate_groups(tracked_dups), _duplicate_groups(full_dups),
+             "tracker", "full recompute")
+    _compare(problems, "overlap", _overlap_pairs(tracked_overlaps), _overlap_pairs(full_overlaps),
+             "tracker", "full recompute")
+
+    return problems
@@ -1,14 +1,25 @@
+import os
 import sys
+import json
+import argparse
 import colorama
-from rdflib import Graph
 from logger import Logger
 
-from interfaces import count_interfaces, list_interfaces, show_interface_details
-from status import status_up, status_down
-from inconsistencies import find_inconsistencies, enable_interface, disable_interface, verify_overlaps
-
-IETF_INTERFACES_FILE = "rdf/ietf-interfaces.ttl"
-IETF_IP_FILE = "rdf/ietf-ip.ttl"
+from interfaces import count_interfaces
+from inconsistencies import print_overlaps
+from conflicts import conflict_tracker
+from lookup import prefix_trie
+from analytics import print_prefix_report
+from commands import execute
+from telemetry import start_ingest, stop_ingest
+from server import make_server
+from wal import recover, open_wal, close_wal
+from query_cache import cached, query_cache
+import metrics
+from patch import apply_patch
+from loader import load_schemas, instance_files, load_instance_files, open_store, IETF_INTERFACES_FILE, IETF_IP_FILE
+from tracking import TrackedGraph
+from index import interface_index
 
 
 def print_menu(instances_file=None, graph_size=0, interfaces_count=0):
@@ -24,90 +35,276 @@ def print_menu(instances_file=None, graph_size=0, interfaces_count=0):
     print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  status-down{colorama.Style.NORMAL} <interface_name>{colorama.Fore.RESET} - Set interface status to 'down'")
     print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  enable{colorama.Style.NORMAL} <interface_name>{colorama.Fore.RESET} - Enable the specified interface")
     print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  disable{colorama.Style.NORMAL} <interface_name>{colorama.Fore.RESET} - Disable the specified interface")
+    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  bulk-update{colorama.Style.NORMAL} <changes_file>{colorama.Fore.RESET} - Apply '<interface> <oper-status|enabled> <value>' lines as one update")
     print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  show{colorama.Style.NORMAL} <interface_name>{colorama.Fore.RESET} - Show details of the specified interface")
+    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  lookup{colorama.Style.NORMAL} <ip_address>{colorama.Fore.RESET} - Find the prefixes (and interfaces) containing an address, most specific first")
     print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  list{colorama.Style.RESET_ALL} - List all interfaces with their details")
-    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  check-inconsistencies{colorama.Style.RESET_ALL} - Finds all enabled interfaces without an IP address assigned")
-    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  verify-overlaps{colorama.Style.RESET_ALL} - Finds all overlapping and duplicate CIDR prefixes among interfaces")
+    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  check-inconsistencies{colorama.Style.NORMAL} [--full]{colorama.Fore.RESET} - Finds all enabled interfaces without an IP address assigned")
+    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  verify-overlaps{colorama.Style.NORMAL} [--full]{colorama.Fore.RESET} - Finds all overlapping and duplicate CIDR prefixes among interfaces")
+    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  report-prefixes{colorama.Style.RESET_ALL} - IPv4 prefix audit: duplicates, overlaps, containment, /16 utilization and free ranges")
+    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  cross-check{colorama.Style.NORMAL} [--reference]{colorama.Fore.RESET} - Compares the maintained conflict state with a full recompute (and the SPARQL reference)")
+    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  ingest-stats{colorama.Style.RESET_ALL} - Show throughput and lag of the telemetry ingestion (--ingest)")
+    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  cache-stats{colorama.Style.RESET_ALL} - Show the hits, misses and size of the query result cache")
+    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  wal-stats{colorama.Style.RESET_ALL} - Show the state of the write-ahead log (--wal)")
+    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  stats{colorama.Style.RESET_ALL} - Show latency, triples scanned and result sizes per operation (--metrics)")
+    print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  apply-patch{colorama.Style.NORMAL} <patch_file>{colorama.Fore.RESET} - Apply an RDF Patch (added/removed triples) to the graph")
     print(f"{colorama.Style.BRIGHT}{colorama.Fore.GREEN}  exit{colorama.Style.RESET_ALL} - Exit the program")
     print(f"\n{colorama.Fore.CYAN}======================================================================================={colorama.Fore.RESET}") 
 
 
+def print_result(result):
+    command = result["command"]
+    if not result["ok"]:
+        Logger.error(result["error"])
+    elif command == "show":
+        print(f"{colorama.Fore.MAGENTA}Interface Details:{colorama.Fore.RESET}")
+        for key, value in result["details"].items():
+            print(f"  {key}: {value}")
+    elif command == "lookup":
+        if result["containing"]:
+            print(f"{colorama.Fore.MAGENTA}Prefixes containing {result['address']}:{colorama.Fore.RESET}")
+            for network in reversed(result["containing"]):
+                print(f"  {network['cidr']} - Interface: {network['interface']}")
+        else:
+            print(f"{colorama.Fore.RED}No prefix contains {result['address']}.{colorama.Fore.RESET}")
+    elif command == "list":
+        for intf in result["interfaces"]:
+            print(f"Interface: {intf['name']}, Status: {intf['status']}, Enabled: {intf['enabled']}")
+    elif command in ("status-up", "status-down"):
+        print(f"{colorama.Fore.MAGENTA}Interface '{result['interface']}' status set to '{command[len('status-'):]}'.{colorama.Fore.RESET}")
+    elif command in ("enable", "disable"):
+        print(f"{colorama.Fore.MAGENTA}Interface '{result['interface']}' {command}d.{colorama.Fore.RESET}")
+    elif command == "bulk-update":
+        print(f"{colorama.Fore.MAGENTA}{result['applied']} changes applied.{colorama.Fore.RESET}")
+        for item in result["failed"]:
+            print(f"{colorama.Fore.RED}  {item['interface']} {item['field']} {item['value']}: {item['error']}{colorama.Fore.RESET}")
+    elif command == "check-inconsistencies":
+        if result["inconsistencies"]:
+            print(f"{colorama.Fore.RED}Inconsistent Interfaces (enabled but no IP address):{colorama.Fore.RESET}")
+            for item in result["inconsistencies"]:
+                print(f"  Interface: {item['name']} ({item['interface']})")
+        else:
+            print(f"{colorama.Fore.GREEN}No inconsistencies found.{colorama.Fore.RESET}")
+    elif command == "verify-overlaps":
+        print_overlaps(result["duplicates"], result["overlaps"])
+    elif command == "report-prefixes":
+        print_prefix_report(result["report"])
+    elif command == "cross-check":
+        for problem in result["problems"]:
+            print(f"{colorama.Fore.RED}  {problem}{colorama.Fore.RESET}")
+        if not result["problems"]:
+            print(f"{colorama.Fore.GREEN}Maintained conflict state matches a full recompute.{colorama.Fore.RESET}")
+    elif command == "ingest-stats":
+        print(f"{colorama.Fore.MAGENTA}Telemetry ingestion from {result['source']}:{colorama.Fore.RESET}")
+        for key, value in result["stats"].items():
+            print(f"  {key}: {value}")
+    elif command == "wal-stats":
+        print(f"{colorama.Fore.MAGENTA}Write-ahead log:{colorama.Fore.RESET}")
+        for key, value in result["stats"].items():
+            print(f"  {key}: {value}")
+    elif command == "cache-stats":
+        print(f"{colorama.Fore.MAGENTA}Query cache:{colorama.Fore.RESET}")
+        for key, value in result["stats"].items():
+            print(f"  {key}: {value}")
+    elif command == "stats":
+        metrics.log_summary()
+    elif command == "apply-patch":
+        print(f"{colorama.Fore.MAGENTA}Patch '{result['patch']}' applied: {result['removed']} triples removed, {result['added']} added.{colorama.Fore.RESET}")
+
+
 def main_loop(graph):
     while True:
         command = input(f"\n{colorama.Fore.BLUE}>{colorama.Fore.RESET} ").strip()
         if command == "exit":
             Logger.log("Exiting the program.")
             break
-        elif command.startswith("show"):
-            _, interface_name = command.split(maxsplit=1)
-            details = show_interface_details(graph, interface_name)
-            if details:
-                print(f"{colorama.Fore.MAGENTA}Interface Details:{colorama.Fore.RESET}")
-                for key, value in details.items():
-                    print(f"  {key}: {value}")
-            else:
-                print(f"{colorama.Fore.RED}Interface '{interface_name}' not found.{colorama.Fore.RESET}")
-        elif command == "list":
-            interfaces = list_interfaces(graph)
-            for intf in interfaces:
-                print(f"Interface: {intf['name']}, Status: {intf['status']}, Enabled: {intf['enabled']}")
-        elif command.startswith("status-up"):
-            _, interface_name = command.split(maxsplit=1)
-            status_up(graph, interface_name)
-            print(f"{colorama.Fore.MAGENTA}Interface '{interface_name}' status set to 'up'.{colorama.Fore.RESET}")
-        elif command.startswith("status-down"):
-            _, interface_name = command.split(maxsplit=1)
-            status_down(graph, interface_name)
-            print(f"{colorama.Fore.MAGENTA}Interface '{interface_name}' status set to 'down'.{colorama.Fore.RESET}")
-        elif command.startswith("enable"):
-            _, interface_name = command.split(maxsplit=1)
-            enable_interface(graph, interface_name)
-            print(f"{colorama.Fore.MAGENTA}Interface '{interface_name}' enabled.{colorama.Fore.RESET}")
-        elif command.startswith("disable"):
-            _, interface_name = command.split(maxsplit=1)
-            disable_interface(graph, interface_name)
-            print(f"{colorama.Fore.MAGENTA}Interface '{interface_name}' disabled.{colorama.Fore.RESET}")
-        elif command == "check-inconsistencies":
-            inconsistencies = find_inconsistencies(graph)
-            if inconsistencies:
-                print(f"{colorama.Fore.RED}Inconsistent Interfaces (enabled but no IP address):{colorama.Fore.RESET}")
-                for iface, name in inconsistencies:
-                    print(f"  Interface: {name} ({iface})")
-            else:
-                print(f"{colorama.Fore.GREEN}No inconsistencies found.{colorama.Fore.RESET}")
-        elif command.startswith("verify"):
-            verify_overlaps(graph)
-        else:
-            Logger.error(f"Unknown command: {command}")
+        print_result(execute(graph, command))
 
 
-if __name__ == "__main__":
-    colorama.init(autoreset=True)
-
-    if len(sys.argv) != 2:
-        Logger.error("Usage: python executor.py <instances_file.ttl>")
-        sys.exit(1)
+def run_script(graph, script):
+    # one JSON line per command; returns the number of failed commands
+    failures = 0
+    for line in script:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line == "exit":
+            break
+        try:
+            result = execute(graph, line)
+        except Exception as e:
+            result = {"command": line.split()[0], "ok": False, "error": f"{type(e).__name__}: {e}"}
+        if not result["ok"]:
+            failures += 1
+        print(json.dumps(result, default=str), flush=True)
+    return failures
 
-    instances_file = sys.argv[1]
 
-    g = Graph()
-    
+def load_graph(graph, instances_file, snapshot=False, workers=None):
+    # instances_file may also be a directory or a glob of instance files
     try:
-        g.parse(IETF_INTERFACES_FILE, format='turtle')
-        g.parse(IETF_IP_FILE, format='turtle')
+        load_schemas(graph, snapshot=snapshot)
     except Exception as e:
         Logger.error(f"Failed to load IETF RDF files: {e}")
         sys.exit(1)
 
+    files = instance_files(instances_file)
+    if not files:
+        Logger.error(f"No instance files found in '{instances_file}'.")
+        sys.exit(1)
+
     try:
-        g.parse(instances_file, format='turtle')
+        load_instance_files(graph, files, snapshot=snapshot, workers=workers)
     except Exception as e:
         Logger.error(f"Failed to load RDF file '{instances_file}': {e}")
         sys.exit(1)
 
-    Logger.log(f"RDF file '{instances_file}' loaded with {len(g)} triples.")
+    Logger.log(f"RDF file '{instances_file}' loaded with {len(graph)} triples.")
+
+
+def recover_graph(graph, wal_dir):
+    try:
+        return recover(graph, wal_dir)
+    except Exception as e:
+        Logger.error(f"Failed to recover the graph from '{wal_dir}': {e}")
+        sys.exit(1)
+
 
-    instances_count = count_interfaces(g)
+def shutdown(graph):
+    stop_ingest(graph)
+    close_wal(graph)
+    graph.close(commit_pending_transaction=True)
+    if metrics.is_enabled():
+        metrics.log_summary()
+
+
+if __name__ == "__main__":
+    colorama.init(autoreset=True)
+
+    parser = argparse.ArgumentParser(usage="python executor.py <instances_file.ttl|instances_dir|'glob'> [--load-workers <n>] [--snapshot] [--store <store.sqlite>] [--wal <wal_dir>] [--cache-size <MB>] [--patch <patch_file> ...] [--script <commands_file>|-] [--ingest file:<events.jsonl>|unix:<socket>] [--serve [host:]port] [--metrics] [--profile <profile_dir>]")
+    parser.add_argument("instances_file", help="an instance file, a directory of .ttl/.nt files or a (quoted) glob pattern")
+    parser.add_argument("--load-workers", type=int, metavar="N",
+                        help="processes parsing the instance files when there are several (default: CPU count)")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="load the RDF files through binary snapshots (.snap), rebuilding them when a source file changes")
+    parser.add_argument("--store", metavar="STORE_FILE",
+                        help="keep the graph in a persistent SQLite store; the RDF files are only loaded when the store is new")
+    parser.add_argument("--wal", metavar="WAL_DIR",
+                        help="log every change to a write-ahead log in WAL_DIR and recover the graph from it on startup; the RDF files are only loaded when WAL_DIR holds no log yet")
+    parser.add_argument("--cache-size", type=int, metavar="MB",
+                        help="memory the cached results of list, check-inconsistencies and verify-overlaps may take (default 256)")
+    parser.add_argument("--patch", action="append", default=[], metavar="PATCH_FILE",
+                        help="RDF Patch applied after loading, e.g. a schema delta from yang2rdf.py --delta-from")
+    parser.add_argument("--script", metavar="COMMANDS_FILE",
+                        help="run the commands in the file ('-' for stdin) instead of the interactive menu, printing one JSON result per line")
+    parser.add_argument("--ingest", metavar="SOURCE",
+                        help="apply oper-status/enabled events from a JSON-lines file (file:<path>) or UNIX socket (unix:<path>) as they arrive")
+    parser.add_argument("--serve", metavar="[HOST:]PORT",
+                        help="serve the operations over HTTP/JSON (on 127.0.0.1 unless a host is given) instead of the interactive menu")
+    parser.add_argument("--metrics", action="store_true",
+                        help="record latency, triples scanned and result size of every operation (stats command, summary on exit)")
+    parser.add_argument("--profile", metavar="PROFILE_DIR",
+                        help="like --metrics, and also write a cProfile dump (.pstats) of every command to PROFILE_DIR")
+    args = parser.parse_args()
+
+    if args.metrics or args.profile:
+        metrics.enable(profile_dir=args.profile)
+
+    # in script mode stdout only carries the JSON results, so the log goes to stderr
+    if args.script:
+        sys.stdout = sys.stderr
+
+    instances_file = args.instances_file
+
+    if args.store and args.wal:
+        Logger.error("--store and --wal cannot be used together: the store is already persistent.")
+        sys.exit(1)
+
+    g = open_store(args.store) if args.store else TrackedGraph()
+    if args.cache_size is not None:
+        query_cache(g).max_bytes = args.cache_size << 20
+
+    if args.store and len(g) > 0:
+        instances_file = g.store.get_meta("instances_file")
+        Logger.log(f"Persistent store '{args.store}' opened with {len(g)} triples (loaded from '{instances_file}').")
+    elif args.wal and os.path.isdir(args.wal) and (recovered := recover_graph(g, args.wal)):
+        checkpoint, replayed = recovered
+        Logger.log(f"Graph recovered from '{args.wal}' with {len(g)} triples (checkpoint {checkpoint}, {replayed} logged changes replayed).")
+    else:
+        with metrics.operation("startup:load"):
+            load_graph(g, instances_file, snapshot=args.snapshot, workers=args.load_workers)
+        if args.store:
+            g.store.set_meta("instances_file", instances_file)
+            g.commit()
+
+    # patches and everything after them are logged
+    if args.wal:
+        try:
+            open_wal(g, args.wal)
+        except OSError as e:
+            Logger.error(f"Failed to open the write-ahead log in '{args.wal}': {e}")
+            sys.exit(1)
+
+    for patch_file in args.patch:
+        try:
+            removed, added = apply_patch(g, patch_file)
+        except Exception as e:
+            Logger.error(f"Failed to apply patch '{patch_file}': {e}")
+            sys.exit(1)
+        Logger.log(f"Patch '{patch_file}' applied: {removed} triples removed, {added} added.")
+    g.commit()
+
+    # built once here, then kept up to date by every change to the graph.
+    # Over a persistent store they read the whole inventory into memory, so
+    # they are only built by the first command that needs them, and
+    # interfaces are looked up through the store's own indexes
+    if args.store:
+        Logger.log("Conflict tracker and prefix trie are built on first use (--store).")
+    else:
+        with metrics.operation("startup:interface-index"):
+            index = interface_index(g)
+        Logger.log(f"Interface index built with {len(index.by_name)} interfaces.")
+        with metrics.operation("startup:conflict-tracker"):
+            tracker = conflict_tracker(g)
+        Logger.log(f"Conflict tracker built with {len(tracker.networks)} prefixes.")
+        with metrics.operation("startup:prefix-trie"):
+            trie = prefix_trie(g)
+        Logger.log(f"Prefix trie built with {len(trie.prefixes)} prefixes.")
+
+    if args.ingest:
+        try:
+            start_ingest(g, args.ingest)
+        except ValueError as e:
+            Logger.error(str(e))
+            sys.exit(1)
+        Logger.log(f"Ingesting telemetry events from '{args.ingest}'.")
+
+    if args.script:
+        sys.stdout = sys.__stdout__
+        with (sys.stdin if args.script == "-" else open(args.script)) as script:
+            failures = run_script(g, script)
+        shutdown(g)
+        sys.exit(1 if failures else 0)
+
+    if args.serve:
+        host, _, port = args.serve.rpartition(":")
+        try:
+            server = make_server(g, host or "127.0.0.1", int(port))
+        except (OSError, ValueError) as e:
+            Logger.error(f"Failed to start the server on '{args.serve}': {e}")
+            sys.exit(1)
+        Logger.log(f"Serving on http://{server.server_address[0]}:{server.server_address[1]}/ (Ctrl+C to stop).")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            Logger.log("Stopping the server.")
+        server.server_close()
+        shutdown(g)
+        sys.exit(0)
+
+    instances_count = cached(g, "count-interfaces", "", lambda: count_interfaces(g))
 
     print_menu(instances_file, len(g), instances_count)
-    main_loop(g)
\ No newline at end of file
+    main_loop(g)
+
+    shutdown(g)
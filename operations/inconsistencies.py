@@ -1,7 +1,17 @@
+import heapq
+import ipaddress
+
 import colorama
+from rdflib import Literal, RDF
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.processor import prepareUpdate
 
-def find_inconsistencies(graph):
-    query = """
+from namespaces import NAMESPACES, IF, IP
+from index import ADDRESS_FAMILIES, resolve_interface
+from metrics import timed, phase
+
+
+FIND_INCONSISTENCIES = prepareQuery("""
     SELECT ?iface ?name
     WHERE {
         ?iface a if:Interface ;
@@ -18,44 +28,27 @@ def find_inconsistencies(graph):
                 ip:interface ?iface .
         }
     }
-    """
-
-    results = graph.query(query)
+    """, initNs=NAMESPACES)
 
-    return [(row.iface, row.name) for row in results]
-
-
-def enable_interface(graph, interface_name):
-    query = """
+ENABLE_INTERFACE = prepareUpdate("""
     DELETE WHERE {
-        inst:%s if:enabled false .
+        ?interface if:enabled false .
     } ;
-    INSERT DATA {
-        inst:%s if:enabled true .
-    }
-    """ % (interface_name, interface_name)
-
-    graph.update(query)
+    INSERT {
+        ?interface if:enabled true .
+    } WHERE {}
+    """, initNs=NAMESPACES)
 
-
-def disable_interface(graph, interface_name):
-    query = """
+DISABLE_INTERFACE = prepareUpdate("""
     DELETE WHERE {
-        inst:%s if:enabled true .
+        ?interface if:enabled true .
     } ;
-    INSERT DATA {
-        inst:%s if:enabled false .
-    }
-    """ % (interface_name, interface_name)
-
-    graph.update(query)
-
-
-def get_all_ipv4_networks(graph):
-    query = """
-    PREFIX ip: <urn:ietf:params:xml:ns:yang:ietf-ip#>
-    PREFIX if: <urn:ietf:params:xml:ns:yang:ietf-interfaces#>
+    INSERT {
+        ?interface if:enabled false .
+    } WHERE {}
+    """, initNs=NAMESPACES)
 
+IPV4_NETWORKS = prepareQuery("""
     SELECT ?ipv4Inst ?iface ?cidr ?start ?end
     WHERE {
         ?ipv4Inst a ip:ipv4-address ;
@@ -65,19 +58,129 @@ def get_all_ipv4_networks(graph):
         OPTIONAL { ?ipv4Inst ip:network-start ?start . }
         OPTIONAL { ?ipv4Inst ip:network-end ?end . }
     }
-    """
-    result = graph.query(query)
-
-    networks = []
-    for row in result:
-        iface_name = str(row.iface).split("#")[-1]
-        networks.append({
-            "interface": iface_name,
-            "cidr": str(row.cidr) if row.cidr else None,
-            "start": int(row.start) if row.start else None,
-            "end": int(row.end) if row.end else None,
-        })
-    return networks
+    """, initNs=NAMESPACES)
+
+IPV6_NETWORKS = prepareQuery("""
+    SELECT ?ipv6Inst ?iface ?ip ?prefix ?cidr ?start ?end
+    WHERE {
+        ?ipv6Inst a ip:ipv6-address ;
+                  ip:interface ?iface .
+
+        OPTIONAL { ?ipv6Inst ip:ip ?ip . }
+        OPTIONAL { ?ipv6Inst ip:prefix-length ?prefix . }
+        OPTIONAL { ?ipv6Inst ip:cidr ?cidr . }
+        OPTIONAL { ?ipv6Inst ip:network-start ?start . }
+        OPTIONAL { ?ipv6Inst ip:network-end ?end . }
+    }
+    """, initNs=NAMESPACES)
+
+
+@timed()
+def find_inconsistencies(graph):
+    # reference implementation; rdflib evaluates each FILTER NOT EXISTS once
+    # per candidate interface, which gets slow on large graphs
+    results = graph.query(FIND_INCONSISTENCIES)
+
+    return [(row.iface, row.name) for row in results]
+
+
+@timed()
+def find_inconsistencies_native(graph):
+    # same answer as find_inconsistencies, from direct index lookups and a
+    # set difference: enabled interfaces minus those some address points to
+    typed = set()
+    for type_uri in ADDRESS_FAMILIES:
+        typed.update(graph.subjects(RDF.type, type_uri))
+    addressed = {iface for address, _, iface in graph.triples((None, IP.interface, None)) if address in typed}
+
+    enabled = set(graph.subjects(IF.enabled, Literal(True)))
+    interfaces = set(graph.subjects(RDF.type, IF.Interface))
+
+    return sorted((iface, name) for iface in (enabled & interfaces) - addressed
+                  for name in graph.objects(iface, IF.name))
+
+
+@timed(size=None)
+def enable_interface(graph, interface_name):
+    with phase("resolve"):
+        interface = resolve_interface(graph, interface_name)
+    if interface is None:
+        return False
+
+    with phase("update"):
+        graph.update(ENABLE_INTERFACE, initBindings={"interface": interface})
+    return True
+
+
+ENABLED = IF.enabled
+ENABLED_VALUES = {True: Literal(True), False: Literal(False)}
+
+
+def enabled_triples(interface, value):
+    # (removed, added) triples that set if:enabled, like ENABLE/DISABLE_INTERFACE
+    if isinstance(value, str) and value.lower() in ("true", "false"):
+        value = value.lower() == "true"
+    if not isinstance(value, bool):
+        raise ValueError(f"Invalid enabled value: {value}")
+
+    return [(interface, ENABLED, ENABLED_VALUES[not value])], [(interface, ENABLED, ENABLED_VALUES[value])]
+
+
+@timed(size=None)
+def disable_interface(graph, interface_name):
+    with phase("resolve"):
+        interface = resolve_interface(graph, interface_name)
+    if interface is None:
+        return False
+
+    with phase("update"):
+        graph.update(DISABLE_INTERFACE, initBindings={"interface": interface})
+    return True
+
+
+def make_network(interface, family, cidr=None, start=None, end=None, ip=None, prefix=None):
+    cidr = str(cidr) if cidr else None
+    start = int(start) if start else None
+    end = int(end) if end else None
+
+    # the generated IPv6 addresses only carry the address itself, so the
+    # range is derived from the CIDR or address/prefix-length when needed
+    if family == "ipv6" and start is None:
+        network = None
+        try:
+            if cidr:
+                network = ipaddress.IPv6Network(cidr, strict=False)
+            elif ip and prefix:
+                network = ipaddress.IPv6Interface(f"{ip}/{prefix}").network
+        except ValueError:
+            pass
+        if network is not None:
+            cidr = network.with_prefixlen
+            start = int(network.network_address)
+            end = int(network.broadcast_address)
+
+    return {
+        "interface": str(interface).split("#")[-1],
+        "family": family,
+        "cidr": cidr,
+        "start": start,
+        "end": end,
+    }
+
+def get_all_ipv4_networks(graph):
+    result = graph.query(IPV4_NETWORKS)
+
+    return [make_network(row.iface, "ipv4", row.cidr, row.start, row.end)
+            for row in result]
+
+def get_all_ipv6_networks(graph):
+    result = graph.query(IPV6_NETWORKS)
+
+    return [make_network(row.iface, "ipv6", row.cidr, row.start, row.end, row.ip, row.prefix)
+            for row in result]
+
+def get_all_networks(graph):
+    return get_all_ipv4_networks(graph) + get_all_ipv6_networks(graph)
 
 def find_duplicate_prefixes(networks):
     seen = {}
@@ -87,7 +190,10 @@ def find_duplicate_prefixes(networks):
     # so it assumes that these values are correct
     # for the respective CIDRs associated to it
     for net in networks:
-        key = (net["start"], net["end"])
+        if net["start"] is None:
+            continue
+
+        key = (net.get("family"), net["start"], net["end"])
 
         if key in seen:
             duplicates.append((seen[key], net))
@@ -97,31 +203,56 @@ def find_duplicate_prefixes(networks):
     return duplicates
 
 def find_overlapping_prefixes(networks):
-    # checks for overlaps using the comparison between the integer
-    # values from the start and end of each network
-    overlaps = []
+    # sort-and-sweep over the integer start/end of each network: networks
+    # are visited by start, and a heap keeps those whose end has not been
+    # passed yet, which are exactly the ones the current network overlaps.
+    # O(n log n + k) for k reported pairs, instead of comparing every pair.
+    def sort_key(i):
+        net = networks[i]
+        return (net.get("family") or "", net["start"])
 
-    for i in range(len(networks)):
-        for j in range(i+1, len(networks)):
-            A = networks[i]
-            B = networks[j]
+    order = sorted((i for i, net in enumerate(networks)
+                    if net["start"] is not None and net["end"] is not None), key=sort_key)
 
-            if A["start"] is None or B["start"] is None:
-                continue
+    pairs = []
+    active = []
+    family = None
 
-            if A["start"] <= B["end"] and B["start"] <= A["end"]:
-                if not (A["start"] == B["start"] and A["end"] == B["end"]):
-                    overlaps.append((A, B))
-    
-    return overlaps
+    for i in order:
+        net = networks[i]
+        if net.get("family") != family:
+            family = net.get("family")
+            active = []
 
+        while active and active[0][0] < net["start"]:
+            heapq.heappop(active)
 
-def verify_overlaps(g):
-    networks = get_all_ipv4_networks(g)
+        for end, j in active:
+            other = networks[j]
+            if not (other["start"] == net["start"] and end == net["end"]):
+                pairs.append((j, i) if j < i else (i, j))
+
+        heapq.heappush(active, (net["end"], i))
 
-    dups = find_duplicate_prefixes(networks)
-    overlaps = find_overlapping_prefixes(networks)
+    # same pairs, in the same order, as comparing every (i, j) with i < j
+    pairs.sort()
 
+    return [(networks[i], networks[j]) for i, j in pairs]
+
+
+@timed(size=lambda conflicts: len(conflicts[0]) + len(conflicts[1]))
+def find_conflicts(graph):
+    with phase("networks"):
+        networks = get_all_networks(graph)
+    with phase("duplicates"):
+        duplicates = find_duplicate_prefixes(networks)
+    with phase("overlaps"):
+        overlaps = find_overlapping_prefixes(networks)
+
+    return duplicates, overlaps
+
+
+def print_overlaps(dups, overlaps):
     print("Duplicate prefixes:")
     for a, b in dups:
         print(f"\t{colorama.Fore.RED}{a['interface']} <--> {b['interface']} ({a['cidr']})")
@@ -132,4 +263,9 @@ def verify_overlaps(g):
     for a, b in overlaps:
         print(f"\t{colorama.Fore.RED}{a['interface']} ({a['cidr']}) overlaps {b['interface']} ({b['cidr']})")
     if not overlaps:
-        print(f"\t{colorama.Fore.GREEN}  No overlaps found.")
\ No newline at end of file
+        print(f"\t{colorama.Fore.GREEN}  No overlaps found.")
+
+
+def verify_overlaps(g):
+    dups, overlaps = find_conflicts(g)
+    print_overlaps(dups, overlaps)
@@ -0,0 +1,97 @@
+from rdflib import Literal, RDF
+
+from namespaces import IF, IP
+from tracking import TrackedGraph, attached
+
+
+# compared on every graph change; Namespace attribute access builds a new URIRef each time
+NAME = IF.name
+INTERFACE = IP.interface
+TYPE = RDF.type
+
+ADDRESS_FAMILIES = {
+    IP["ipv4-address"]: "ipv4",
+    IP["ipv6-address"]: "ipv6",
+}
+
+
+class InterfaceIndex:
+    # if:name -> interface subject, and interface -> its address nodes.
+    # Built with one pass over the name and address triples and kept up to
+    # date from the TrackedGraph change notifications.
+
+    def __init__(self, graph):
+        self.by_name = {}
+        self.addresses = {}
+        self.families = {}
+
+        for s, _, name in graph.triples((None, NAME, None)):
+            self.by_name[str(name)] = s
+        for address, _, iface in graph.triples((None, INTERFACE, None)):
+            self.addresses.setdefault(iface, set()).add(address)
+        for type_uri, family in ADDRESS_FAMILIES.items():
+            for address in graph.subjects(RDF.type, type_uri):
+                self.families[address] = family
+
+    def resolve(self, interface_name):
+        return self.by_name.get(interface_name)
+
+    def address_nodes(self, interface, family=None):
+        return [a for a in self.addresses.get(interface, ())
+                if family is None or self.families.get(a) == family]
+
+    def triple_added(self, triple):
+        s, p, o = triple
+        if p == NAME:
+            self.by_name[str(o)] = s
+        elif p == INTERFACE:
+            self.addresses.setdefault(o, set()).add(s)
+        elif p == TYPE and o in ADDRESS_FAMILIES:
+            self.families[s] = ADDRESS_FAMILIES[o]
+
+    def triple_removed(self, triple):
+        s, p, o = triple
+        if p == NAME:
+            if self.by_name.get(str(o)) == s:
+                del self.by_name[str(o)]
+        elif p == INTERFACE:
+            nodes = self.addresses.get(o)
+            if nodes:
+                nodes.discard(s)
+                if not nodes:
+                    del self.addresses[o]
+        elif p == TYPE and o in ADDRESS_FAMILIES:
+            self.families.pop(s, None)
+
+
+def interface_index(graph):
+    return attached(graph, InterfaceIndex)
+
+
+FAMILY_TYPES = {family: type_uri for type_uri, family in ADDRESS_FAMILIES.items()}
+
+
+def store_indexed(graph):
+    # the graph's store looks triples up by predicate and object itself
+    # (the persistent SQLite store), so no InterfaceIndex is built over it
+    return getattr(graph.store, "indexed_lookups", False)
+
+
+def resolve_interface(graph, interface_name):
+    if isinstance(graph, TrackedGraph) and not store_indexed(graph):
+        return interface_index(graph).resolve(interface_name)
+
+    # without change tracking there is no index to keep fresh, so fall back
+    # to the store's own (if:name, value) lookup
+    return graph.value(predicate=NAME, object=Literal(interface_name))
+
+
+def address_nodes(graph, interface, family):
+    # the interface's "ipv4"/"ipv6" address nodes, or None when the graph has
+    # no index (a plain Graph), so the caller falls back to matching them
+    if store_indexed(graph):
+        return [address for address in graph.subjects(INTERFACE, interface)
+                if (address, TYPE, FAMILY_TYPES[family]) in graph]
+    if isinstance(graph, TrackedGraph):
+        return interface_index(graph).address_nodes(interface, family)
+    return None
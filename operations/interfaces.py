@@ -1,49 +1,86 @@
-def count_interfaces(graph):
-    query = """
+from rdflib import RDF
+from rdflib.plugins.sparql import prepareQuery
+
+from namespaces import NAMESPACES, IF, IP
+from index import resolve_interface, address_nodes
+from metrics import timed, phase
+
+
+COUNT_INTERFACES = prepareQuery("""
     SELECT (COUNT(?interface) AS ?interfaces)
     WHERE {
         ?interface a if:Interface .
     }
-    """
-
-    result = graph.query(query)
+    """, initNs=NAMESPACES)
 
-    for row in result:
-        return row.interfaces
-    
-def show_interface_details(graph, interface_name):
-    query = f"""
+SHOW_INTERFACE = prepareQuery("""
     SELECT ?interface ?name ?enabled ?operStatus ?ipv4 ?prefix ?ipv6 ?cidr ?start ?end
-    WHERE {{
+    WHERE {
         ?interface a if:Interface ;
             if:name ?name ;
             if:enabled ?enabled ;
             if:oper-status ?operStatus .
 
-        OPTIONAL {{
+        OPTIONAL {
             ?ipv4Inst a ip:ipv4-address ;
                       ip:interface ?interface ;
                       ip:ip ?ipv4 .
 
-            OPTIONAL {{ ?ipv4Inst ip:prefix-length ?prefix . }}
-            OPTIONAL {{ ?ipv4Inst ip:cidr ?cidr . }}
-            OPTIONAL {{ ?ipv4Inst ip:network-start ?start . }}
-            OPTIONAL {{ ?ipv4Inst ip:network-end ?end . }}
-        }}
+            OPTIONAL { ?ipv4Inst ip:prefix-length ?prefix . }
+            OPTIONAL { ?ipv4Inst ip:cidr ?cidr . }
+            OPTIONAL { ?ipv4Inst ip:network-start ?start . }
+            OPTIONAL { ?ipv4Inst ip:network-end ?end . }
+        }
 
-        OPTIONAL {{
+        OPTIONAL {
             ?ipv6Inst a ip:ipv6-address ;
                       ip:interface ?interface ;
                       ip:ip ?ipv6 .
-        }}
+        }
+    }
+    """, initNs=NAMESPACES)
 
-        FILTER (?name = "{interface_name}")
-    }}
-    """
+LIST_INTERFACES = prepareQuery("""
+    SELECT ?interface ?name ?status ?enabled
+    WHERE {
+        ?interface a if:Interface ;
+            if:enabled ?enabled ;
+            if:name ?name ;
+            if:oper-status ?status .
+    }
+    """, initNs=NAMESPACES)
+
+
+@timed(size=None)
+def count_interfaces(graph):
+    # a store that can count (the SQLite store) does it without reading the triples
+    count = getattr(graph.store, "count", None)
+    if count is not None:
+        return count((None, RDF.type, IF.Interface))
 
-    result = graph.query(query)
+    result = graph.query(COUNT_INTERFACES)
 
     for row in result:
+        return row.interfaces
+
+@timed(size=None)
+def show_interface_details(graph, interface_name):
+    # the interface is looked up by name in the index and bound as the
+    # subject, instead of filtering every interface by name
+    with phase("resolve"):
+        interface = resolve_interface(graph, interface_name)
+    if interface is None:
+        return None
+
+    ipv4_nodes = address_nodes(graph, interface, "ipv4")
+    if ipv4_nodes is not None:
+        with phase("read"):
+            return _read_interface_details(graph, interface, ipv4_nodes, address_nodes(graph, interface, "ipv6"))
+
+    with phase("evaluate"):
+        rows = list(graph.query(SHOW_INTERFACE, initBindings={"interface": interface}))
+
+    for row in rows:
         return {
             'interface': str(row.interface),   # clean URI → "eth9"
             'name': str(row.name),
@@ -58,25 +95,58 @@ def show_interface_details(graph, interface_name):
         }
 
 
-def list_interfaces(graph):
-    query = """
-    SELECT ?interface ?name ?status ?enabled
-    WHERE {
-        ?interface a if:Interface ;
-            if:enabled ?enabled ;
-            if:name ?name ;
-            if:oper-status ?status .
+def _with_ip(graph, nodes):
+    # first address node (in a stable order) carrying an ip:ip, as SHOW_INTERFACE requires
+    for node in sorted(nodes):
+        ip = graph.value(node, IP.ip)
+        if ip is not None:
+            return node, ip
+    return None, None
+
+
+def _read_interface_details(graph, interface, ipv4_nodes, ipv6_nodes):
+    # same answer as SHOW_INTERFACE, from direct lookups on the subject and
+    # its indexed address nodes instead of matching every address node
+    name = graph.value(interface, IF.name)
+    enabled = graph.value(interface, IF.enabled)
+    oper_status = graph.value(interface, IF["oper-status"])
+    if name is None or enabled is None or oper_status is None \
+            or (interface, RDF.type, IF.Interface) not in graph:
+        return None
+
+    ipv4_node, ipv4 = _with_ip(graph, ipv4_nodes)
+    _, ipv6 = _with_ip(graph, ipv6_nodes)
+
+    def ipv4_value(predicate):
+        value = graph.value(ipv4_node, predicate) if ipv4_node is not None else None
+        return str(value) if value else None
+
+    return {
+        'interface': str(interface),
+        'name': str(name),
+        'enabled': str(enabled),
+        'oper-status': str(oper_status),
+        'ipv4': str(ipv4) if ipv4 else None,
+        'prefix-length': ipv4_value(IP["prefix-length"]),
+        'cidr': ipv4_value(IP.cidr),
+        'network-start': ipv4_value(IP["network-start"]),
+        'network-end': ipv4_value(IP["network-end"]),
+        'ipv6': str(ipv6) if ipv6 else None
     }
-    """
 
-    result = graph.query(query)
 
-    interfaces = []
-    for row in result:
-        interfaces.append({
-            'interface': str(row.interface),
-            'name': str(row.name),
-            'status': str(row.status),
-            'enabled': str(row.enabled)
-        })
-    return interfaces
\ No newline at end of file
+@timed()
+def list_interfaces(graph):
+    with phase("evaluate"):
+        rows = list(graph.query(LIST_INTERFACES))
+
+    with phase("build"):
+        interfaces = []
+        for row in rows:
+            interfaces.append({
+                'interface': str(row.interface),
+                'name': str(row.name),
+                'status': str(row.status),
+                'enabled': str(row.enabled)
+            })
+    return interfaces
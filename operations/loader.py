@@ -0,0 +1,102 @@
+import os
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from rdflib import Graph
+
+from logger import Logger
+from snapshot import load_with_snapshot, rdf_format, encode_graph, insert_encoded
+from sqlite_store import SQLiteStore
+from tracking import TrackedGraph
+
+IETF_INTERFACES_FILE = "rdf/ietf-interfaces.ttl"
+IETF_IP_FILE = "rdf/ietf-ip.ttl"
+
+INSTANCE_EXTENSIONS = (".ttl", ".nt")
+
+
+def load_file(graph, path, snapshot=False):
+    if snapshot:
+        load_with_snapshot(graph, path)
+    else:
+        graph.parse(path, format=rdf_format(path))
+
+
+def load_schemas(graph, snapshot=False):
+    load_file(graph, IETF_INTERFACES_FILE, snapshot)
+    load_file(graph, IETF_IP_FILE, snapshot)
+
+
+def load_instances(graph, instances_file, snapshot=False):
+    load_file(graph, instances_file, snapshot)
+
+
+def instance_files(spec):
+    # the instance files named by spec: a file, a directory (its .ttl and .nt
+    # files) or a glob pattern
+    if os.path.isdir(spec):
+        return sorted(os.path.join(spec, name) for name in os.listdir(spec)
+                      if name.endswith(INSTANCE_EXTENSIONS) and os.path.isfile(os.path.join(spec, name)))
+    if glob.has_magic(spec):
+        return sorted(path for path in glob.glob(spec) if os.path.isfile(path))
+    return [spec]
+
+
+def parse_encoded(path):
+    # runs in a worker process: parses one file and hands it back dictionary
+    # encoded (a term table and a flat array of term ids), which pickles far
+    # smaller and faster than rdflib terms
+    start = time.perf_counter()
+    g = Graph()
+    g.parse(path, format=rdf_format(path))
+    terms, triples = encode_graph(g)
+    namespaces = [(prefix, str(ns)) for prefix, ns in g.namespaces()]
+    return terms, triples, namespaces, time.perf_counter() - start
+
+
+def _rate(count, seconds):
+    return f"{count / max(seconds, 1e-9):,.0f} triples/s"
+
+
+def load_instance_files(graph, files, snapshot=False, workers=None):
+    # loads several instance files, parsed in parallel by worker processes
+    # and inserted here as each one arrives; logs the throughput per file and
+    # returns the number of triples read
+    start = time.perf_counter()
+    total = 0
+
+    if len(files) == 1 or snapshot or workers == 1:
+        # one file gains nothing from a worker, and snapshots are already encoded
+        for path in files:
+            before, size = time.perf_counter(), len(graph)
+            load_file(graph, path, snapshot)
+            count, elapsed = len(graph) - size, time.perf_counter() - before
+            total += count
+            Logger.log(f"{path}: {count} triples loaded in {elapsed:.3f}s ({_rate(count, elapsed)})")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(parse_encoded, path): path for path in files}
+            for future in as_completed(futures):
+                terms, triples, namespaces, parse_time = future.result()
+
+                before, size = time.perf_counter(), len(graph)
+                for prefix, ns in namespaces:
+                    graph.bind(prefix, ns)
+                insert_encoded(graph, terms, triples)
+                count = len(graph) - size
+                total += count
+                Logger.log(f"{futures[future]}: {count} triples parsed in {parse_time:.3f}s ({_rate(count, parse_time)}), "
+                           f"inserted in {time.perf_counter() - before:.3f}s")
+
+    if len(files) > 1:
+        elapsed = time.perf_counter() - start
+        Logger.log(f"{len(files)} files, {total} triples loaded in {elapsed:.3f}s ({_rate(total, elapsed)}).")
+    return total
+
+
+def open_store(path):
+    # a TrackedGraph over the persistent SQLite store at path, created if missing
+    store = SQLiteStore()
+    store.open(path)
+    return TrackedGraph(store=store)
@@ -1,3 +1,4 @@
+import sys
 import time
 import colorama
 
@@ -6,4 +7,17 @@ class Logger:
         print(f"{colorama.Fore.CYAN}[!] {colorama.Fore.RESET}{colorama.Style.DIM}{time.strftime('%Y-%m-%d %H:%M:%S')}{colorama.Fore.RESET}{colorama.Style.RESET_ALL} -- {message}")
 
     def error(message):
-        print(f"{colorama.Fore.RED}[x] {colorama.Fore.RESET}{colorama.Style.DIM}{time.strftime('%Y-%m-%d %H:%M:%S')}{colorama.Fore.RESET}{colorama.Style.RESET_ALL} -- {message}")
\ No newline at end of file
+        print(f"{colorama.Fore.RED}[x] {colorama.Fore.RESET}{colorama.Style.DIM}{time.strftime('%Y-%m-%d %H:%M:%S')}{colorama.Fore.RESET}{colorama.Style.RESET_ALL} -- {message}")
+
+class PlainLogger:
+    # uncolored, one "time LEVEL message key=value ..." line per call on
+    # stderr, for output read by scripts and log collectors
+    def _write(level, message, fields):
+        pairs = "".join(f" {key}={value}" for key, value in fields.items())
+        print(f"{time.strftime('%Y-%m-%dT%H:%M:%S')} {level} {message}{pairs}", file=sys.stderr, flush=True)
+
+    def log(message, **fields):
+        PlainLogger._write("INFO", message, fields)
+
+    def error(message, **fields):
+        PlainLogger._write("ERROR", message, fields)
@@ -0,0 +1,131 @@
+import ipaddress
+
+from rdflib import RDF
+
+from index import ADDRESS_FAMILIES, INTERFACE
+from tracking import attached
+from conflicts import ADDRESS_WIDTHS, ADDRESS_PREDICATES, TYPE, is_cidr_block, read_network
+
+
+class _Node:
+    # a trie node stands for the block of addresses whose first `length` bits
+    # are `bits`; entries are the address nodes configured with that block
+    __slots__ = ("bits", "length", "children", "entries")
+
+    def __init__(self, bits, length):
+        self.bits = bits
+        self.length = length
+        self.children = [None, None]
+        self.entries = {}
+
+
+class PrefixTrie:
+    # Binary radix trie (path-compressed, one per address family) of the
+    # configured prefixes, for longest-prefix-match lookups in O(address
+    # width). Kept up to date from the TrackedGraph change notifications.
+    # Ranges that are not CIDR blocks have no place in it and are left out.
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.roots = {family: _Node(0, 0) for family in ADDRESS_WIDTHS}
+        self.prefixes = {}  # address node -> (family, start, prefix length)
+
+        for type_uri in ADDRESS_FAMILIES:
+            for node in set(graph.subjects(RDF.type, type_uri)):
+                self._refresh(node)
+
+    def _insert(self, family, start, length, key, network):
+        width = ADDRESS_WIDTHS[family]
+        bits = start >> (width - length)
+        node = self.roots[family]
+
+        while node.length != length:
+            branch = (start >> (width - node.length - 1)) & 1
+            child = node.children[branch]
+            if child is None:
+                node.children[branch] = node = _Node(bits, length)
+                break
+
+            # length of the prefix shared by the child's block and this one
+            common = min(child.length, length)
+            diff = (child.bits >> (child.length - common)) ^ (bits >> (length - common))
+            common -= diff.bit_length()
+
+            if common < child.length:
+                # split the edge with a node for the shared prefix
+                middle = _Node(bits >> (length - common), common)
+                middle.children[(child.bits >> (child.length - common - 1)) & 1] = child
+                node.children[branch] = middle
+                child = middle
+            node = child
+
+        node.entries[key] = network
+
+    def _remove(self, family, start, length, key):
+        width = ADDRESS_WIDTHS[family]
+        path = [self.roots[family]]
+        while path[-1].length != length:
+            path.append(path[-1].children[(start >> (width - path[-1].length - 1)) & 1])
+
+        del path[-1].entries[key]
+
+        # drop the nodes left without entries, and the ones that only join two edges
+        while len(path) > 1 and not path[-1].entries:
+            node, parent = path.pop(), path[-1]
+            children = [c for c in node.children if c is not None]
+            if len(children) == 2:
+                break
+            parent.children[parent.children.index(node)] = children[0] if children else None
+
+    def _refresh(self, node):
+        network = read_network(self.graph, node)
+        prefix = None
+        if network is not None and is_cidr_block(network["start"], network["end"]):
+            size = network["end"] - network["start"] + 1
+            prefix = (network["family"], network["start"], ADDRESS_WIDTHS[network["family"]] - size.bit_length() + 1)
+
+        old = self.prefixes.pop(node, None)
+        if old is not None:
+            self._remove(*old, node)
+        if prefix is not None:
+            self.prefixes[node] = prefix
+            self._insert(*prefix, node, network)
+
+    def lookup(self, family, address):
+        # the networks containing the address, from least to most specific
+        width = ADDRESS_WIDTHS[family]
+        node = self.roots[family]
+        matches = []
+
+        while node is not None and node.bits == address >> (width - node.length):
+            matches.extend(node.entries.values())
+            if node.length == width:
+                break
+            node = node.children[(address >> (width - node.length - 1)) & 1]
+
+        return matches
+
+    def triple_added(self, triple):
+        s, p, o = triple
+        if p == INTERFACE or p in ADDRESS_PREDICATES or (p == TYPE and o in ADDRESS_FAMILIES):
+            self._refresh(s)
+
+    triple_removed = triple_added
+
+
+def prefix_trie(graph):
+    return attached(graph, PrefixTrie)
+
+
+def lookup_address(graph, address):
+    # raises ValueError when the address is not a valid IPv4/IPv6 address
+    address = ipaddress.ip_address(address)
+    family = "ipv4" if address.version == 4 else "ipv6"
+
+    containing = prefix_trie(graph).lookup(family, int(address))
+
+    return {
+        "address": str(address),
+        "most-specific": containing[-1] if containing else None,
+        "containing": containing,
+    }
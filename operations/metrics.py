@@ -0,0 +1,244 @@
+import os
+import math
+import time
+import cProfile
+import threading
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+from logger import PlainLogger
+from tracking import TrackedGraph
+
+
+# Instrumentation of the operations, off unless enable() is called: while
+# off, timed() functions only pay for one flag check and phase() and
+# profiled() hand back a shared no-op context.
+#
+#   @timed("list_interfaces")          latency, triples scanned and result size
+#   def list_interfaces(graph): ...    of every call
+#
+#   with phase("evaluate"): ...        latency of a part of the running
+#                                      operation, as "<operation>/evaluate"
+
+BUCKETS = 40
+NULL = nullcontext()
+
+
+class Histogram:
+    # values in power-of-two buckets starting at `unit` (1 µs for latencies,
+    # 1 for counts), with the exact count, sum, minimum and maximum;
+    # quantiles are the upper bound of their bucket
+
+    def __init__(self, unit=1.0):
+        self.unit = unit
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        scaled = value / self.unit
+        bucket = 0 if scaled < 1 else min(int(math.log2(scaled)) + 1, BUCKETS - 1)
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        rank = q * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(self.unit * (1 << bucket), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+class _State(threading.local):
+    # per thread: triples scanned so far and the operations running
+    scanned = 0
+
+    def __init__(self):
+        self.running = []
+
+
+_enabled = False
+_profile_dir = None
+_profiles = 0
+_state = _State()
+_lock = threading.Lock()
+_latency = {}    # operation or "operation/phase" -> Histogram of seconds
+_scanned = {}    # operation -> Histogram of triples scanned per call
+_sizes = {}      # operation -> Histogram of result sizes
+
+
+def _count_scanned(triples):
+    state = _state
+    for triple in triples:
+        state.scanned += 1
+        yield triple
+
+
+def enable(profile_dir=None):
+    # profile_dir: also write a cProfile dump of every command there
+    global _enabled, _profile_dir
+    _enabled = True
+    _profile_dir = profile_dir
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+    TrackedGraph.scan_hook = _count_scanned
+
+
+def disable():
+    global _enabled, _profile_dir
+    _enabled = False
+    _profile_dir = None
+    TrackedGraph.scan_hook = None
+
+
+def is_enabled():
+    return _enabled
+
+
+def _histogram(table, name, unit):
+    histogram = table.get(name)
+    if histogram is None:
+        histogram = table[name] = Histogram(unit)
+    return histogram
+
+
+def _record(name, seconds, scanned=None, size=None):
+    with _lock:
+        _histogram(_latency, name, 1e-6).add(seconds)
+        if scanned is not None:
+            _histogram(_scanned, name, 1).add(scanned)
+        if size is not None:
+            _histogram(_sizes, name, 1).add(size)
+
+
+def _size(result):
+    if isinstance(result, (list, tuple, set, dict)):
+        return len(result)
+    return None
+
+
+@contextmanager
+def _operation(name):
+    state = _state
+    scanned = state.scanned
+    state.running.append(name)
+    start = time.perf_counter()
+    outcome = {}
+    try:
+        yield outcome
+    finally:
+        elapsed = time.perf_counter() - start
+        state.running.pop()
+        _record(name, elapsed, state.scanned - scanned, outcome.get("size"))
+
+
+def operation(name):
+    # times the block as operation `name`; set ["size"] on the yielded dict
+    # to record a result size
+    return _operation(name) if _enabled else NULL
+
+
+def timed(name=None, size=_size):
+    # decorator: every call is an operation named after the function, with
+    # size(result) (None to skip) as its result size
+    def decorate(function):
+        operation_name = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _operation(operation_name) as outcome:
+                result = function(*args, **kwargs)
+                if size is not None:
+                    outcome["size"] = size(result)
+                return result
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def _phase(name):
+    running = _state.running
+    full_name = f"{running[-1]}/{name}" if running else name
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _histogram(_latency, full_name, 1e-6).add(time.perf_counter() - start)
+
+
+def phase(name):
+    return _phase(name) if _enabled else NULL
+
+
+@contextmanager
+def _profiled(name):
+    global _profiles
+    with _lock:
+        _profiles += 1
+        number = _profiles
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        path = os.path.join(_profile_dir, f"{number:05d}-{name}.pstats")
+        profile.dump_stats(path)
+        PlainLogger.log("profile written", command=name, file=path)
+
+
+def profiled(name):
+    # cProfile dump of the block, when enable() was given a profile directory
+    return _profiled(name) if _profile_dir else NULL
+
+
+def snapshot():
+    with _lock:
+        return {
+            "latency-seconds": {name: h.summary() for name, h in sorted(_latency.items())},
+            "triples-scanned": {name: h.summary() for name, h in sorted(_scanned.items())},
+            "result-sizes": {name: h.summary() for name, h in sorted(_sizes.items())},
+        }
+
+
+def reset():
+    with _lock:
+        _latency.clear()
+        _scanned.clear()
+        _sizes.clear()
+
+
+def log_summary(logger=PlainLogger):
+    # one structured line per operation and phase
+    stats = snapshot()
+    for name, latency in stats["latency-seconds"].items():
+        fields = {"operation": name, "calls": latency["count"],
+                  "mean_ms": round(latency["mean"] * 1e3, 3), "p95_ms": round(latency["p95"] * 1e3, 3),
+                  "max_ms": round(latency["max"] * 1e3, 3)}
+        if name in stats["triples-scanned"]:
+            fields["scanned_mean"] = round(stats["triples-scanned"][name]["mean"], 1)
+        if name in stats["result-sizes"]:
+            fields["size_mean"] = round(stats["result-sizes"][name]["mean"], 1)
+        logger.log("metrics", **fields)
@@ -0,0 +1,9 @@
+from rdflib import Namespace
+
+INST = Namespace("http://example.org/instances#")
+IF = Namespace("urn:ietf:params:xml:ns:yang:ietf-interfaces#")
+IP = Namespace("urn:ietf:params:xml:ns:yang:ietf-ip#")
+
+# prefixes used by the prepared queries, resolved once at import instead of
+# from whatever the loaded files happen to bind
+NAMESPACES = {"inst": INST, "if": IF, "ip": IP}
@@ -0,0 +1,61 @@
+from rdflib import Graph, URIRef, BNode
+
+
+_escapes = str.maketrans({
+    '\\': '\\\\',
+    '"': '\\"',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+
+def nt_term(term):
+    # N-Triples form of a term, as converter/streaming.py writes them
+    if isinstance(term, URIRef):
+        return f"<{term}>"
+    if isinstance(term, BNode):
+        return f"_:{term}"
+
+    value = f'"{str(term).translate(_escapes)}"'
+    if term.language:
+        return f"{value}@{term.language}"
+    if term.datatype:
+        return f"{value}^^<{term.datatype}>"
+    return value
+
+
+def nt_row(triple):
+    s, p, o = triple
+    return f"{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n"
+
+
+def read_patch(patch_file):
+    # RDF Patch as written by converter/yang2rdf.py --delta-from:
+    # "D <s> <p> <o> ." deletes a triple, "A <s> <p> <o> ." adds one
+    removed, added = [], []
+
+    with open(patch_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            op, _, triple = line.strip().partition(" ")
+            if op == "D":
+                removed.append(triple)
+            elif op == "A":
+                added.append(triple)
+            elif op == "TA":
+                raise ValueError(f"Patch '{patch_file}' is an aborted transaction")
+
+    # only the changed triples are parsed, never the whole schema
+    removed_graph = Graph().parse(data="\n".join(removed), format='nt')
+    added_graph = Graph().parse(data="\n".join(added), format='nt')
+
+    return removed_graph, added_graph
+
+
+def apply_patch(graph, patch_file):
+    removed, added = read_patch(patch_file)
+
+    for triple in removed:
+        graph.remove(triple)
+    graph.addN((s, p, o, graph) for s, p, o in added)
+
+    return len(removed), len(added)
@@ -0,0 +1,117 @@
+import sys
+import threading
+from collections import OrderedDict
+
+
+MAX_BYTES = 256 << 20   # estimated memory the cached results may take
+
+
+def estimate_size(value):
+    # rough memory taken by a JSON-like result (dicts, lists, tuples, strings,
+    # numbers); objects referenced from many places, like a network that
+    # overlaps many others, count once
+    seen = set()
+    stack = [value]
+    size = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set)):
+            stack.extend(item)
+    return size
+
+
+class QueryCache:
+    # Results of read-only operations, keyed on (operation, arguments) and
+    # stamped with the graph version they were computed at: a lookup at any
+    # other version is a miss, and its result replaces the stale one. The
+    # least recently used results are evicted once their estimated size goes
+    # over max_bytes. Results are shared between callers and must not be
+    # modified.
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()   # (operation, arguments) -> (version, result, size)
+        self._lock = threading.Lock()
+
+    def get(self, key, version, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # computed outside the cache lock, so other operations are not held up
+        result = compute()
+        size = estimate_size(result)
+
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None and old[0] > version:
+                # a newer result was stored meanwhile
+                return result
+            if old is not None:
+                del self._entries[key]
+                self.bytes -= old[2]
+            if size <= self.max_bytes:
+                self._entries[key] = (version, result, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, _, evicted) = self._entries.popitem(last=False)
+                    self.bytes -= evicted
+                    self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max-bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit-ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+_creating = threading.Lock()
+
+
+def query_cache(graph):
+    # kept on the graph itself, so it goes away with it and can never be
+    # mistaken for the cache of another graph
+    cache = getattr(graph, "_query_cache", None)
+    if cache is None:
+        with _creating:
+            cache = getattr(graph, "_query_cache", None)
+            if cache is None:
+                cache = graph._query_cache = QueryCache()
+    return cache
+
+
+def cached(graph, operation, arguments, compute):
+    # compute() for graph, reused until the graph changes; graphs without a
+    # version (anything but a TrackedGraph) are not cached
+    version = getattr(graph, "version", None)
+    if version is None:
+        return compute()
+    return query_cache(graph).get((operation, arguments), version, compute)
@@ -0,0 +1,137 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from commands import execute, run
+
+
+WORKERS = 8
+
+# GET routes: path (with {} for the last segment) -> command line template;
+# "?full=1" / "?reference=1" add the command's flag
+READ_ROUTES = {
+    "/interfaces": "list",
+    "/interfaces/{}": "show {}",
+    "/inconsistencies": "check-inconsistencies",
+    "/overlaps": "verify-overlaps",
+    "/lookup/{}": "lookup {}",
+    "/report-prefixes": "report-prefixes",
+    "/cross-check": "cross-check",
+    "/ingest-stats": "ingest-stats",
+    "/wal-stats": "wal-stats",
+    "/cache-stats": "cache-stats",
+    "/stats": "stats",
+}
+
+# POST /interfaces/<name>/<action>
+WRITE_ACTIONS = ("status-up", "status-down", "enable", "disable")
+
+FLAGS = {"full": "--full", "reference": "--reference"}
+
+
+class PooledHTTPServer(HTTPServer):
+    # HTTPServer whose requests run on a fixed pool of threads instead of one
+    # new thread per request; the graph's read-write lock (taken by
+    # commands.execute) lets the queries among them run side by side
+
+    def __init__(self, address, handler, workers=WORKERS):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+class GraphRequestHandler(BaseHTTPRequestHandler):
+    graph = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _respond(self, command, call):
+        # a handler failing unexpectedly still gets a JSON answer; what it
+        # applied before the error is committed by commands.run, but the
+        # request is not acknowledged as done
+        try:
+            result = call()
+        except Exception as e:
+            return self._reply(500, {"command": command, "ok": False, "error": f"{type(e).__name__}: {e}"})
+        self._reply(200 if result["ok"] else 400, result)
+
+    def _run(self, line):
+        self._respond(line.partition(" ")[0], lambda: execute(self.graph, line))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/")
+        head, _, last = path.rpartition("/")
+
+        line = READ_ROUTES.get(path)
+        if line is None and head + "/{}" in READ_ROUTES:
+            line = READ_ROUTES[head + "/{}"].format(unquote(last))
+        if line is None:
+            return self._reply(404, {"ok": False, "error": f"Unknown path: {url.path}"})
+
+        query = parse_qs(url.query)
+        for name, flag in FLAGS.items():
+            if query.get(name, ["0"])[0] not in ("", "0", "false"):
+                line += f" {flag}"
+        self._run(line)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path.rstrip("/")
+
+        if path == "/bulk-update":
+            return self._bulk_update()
+
+        parts = path.split("/")
+        if len(parts) == 4 and parts[1] == "interfaces" and parts[3] in WRITE_ACTIONS:
+            return self._run(f"{parts[3]} {unquote(parts[2])}")
+        if len(parts) == 2 and parts[1] == "apply-patch":
+            body = self._body()
+            return self._run(f"apply-patch {body.get('patch', '') if isinstance(body, dict) else ''}")
+
+        self._reply(404, {"ok": False, "error": f"Unknown path: {path}"})
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return None
+
+    def _bulk_update(self):
+        # body: [{"interface": ..., "field": "oper-status"|"enabled", "value": ...}, ...]
+        items = self._body()
+        if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+            return self._reply(400, {"ok": False, "error": "Expected a JSON list of {interface, field, value} objects."})
+
+        changes = [(i.get("interface"), i.get("field"), i.get("value")) for i in items]
+        self._respond("bulk-update", lambda: run(self.graph, "bulk-update", changes))
+
+    def log_message(self, format, *args):
+        # one line per request would drown the executor's own log
+        pass
+
+
+def make_server(graph, host="127.0.0.1", port=8080, workers=WORKERS):
+    handler = type("Handler", (GraphRequestHandler,), {"graph": graph})
+    return PooledHTTPServer((host, port), handler, workers)
@@ -0,0 +1,271 @@
+import os
+import sys
+import mmap
+import struct
+import hashlib
+from array import array
+
+from rdflib import Graph, URIRef, BNode, Literal
+from logger import Logger
+
+
+# Snapshot layout (little-endian):
+#   header     magic, source mtime (ns), source size, source sha256,
+#              namespace count, term count, triple count
+#   namespaces (prefix, namespace) string pairs
+#   terms      kind byte, value string and, for typed/tagged literals,
+#              the datatype or language string
+#   triples    3 uint32 term ids per triple, 4-byte aligned
+MAGIC = b"Y2RSNAP1"
+HEADER = struct.Struct("<8sqq32sIIQ")
+MTIME_OFFSET = 8
+LENGTH = struct.Struct("<I")
+
+URI, BLANK, PLAIN, TYPED, TAGGED = b"U", b"B", b"L", b"T", b"G"
+
+SNAPSHOT_SUFFIX = ".snap"
+
+
+def encode_term(term):
+    if isinstance(term, URIRef):
+        return URI, str(term), None
+    if isinstance(term, BNode):
+        return BLANK, str(term), None
+    if term.language:
+        return TAGGED, str(term), term.language
+    if term.datatype:
+        return TYPED, str(term), str(term.datatype)
+    return PLAIN, str(term), None
+
+
+def decode_term(kind, value, extra):
+    if kind == URI:
+        return URIRef(value)
+    if kind == BLANK:
+        return BNode(value)
+    if kind == TAGGED:
+        return Literal(value, lang=extra)
+    if kind == TYPED:
+        return Literal(value, datatype=URIRef(extra))
+    return Literal(value)
+
+
+def _write_string(f, value):
+    data = value.encode('utf-8')
+    f.write(LENGTH.pack(len(data)))
+    f.write(data)
+
+
+def _read_string(buf, offset):
+    (length,) = LENGTH.unpack_from(buf, offset)
+    offset += LENGTH.size
+    return str(buf[offset:offset + length], 'utf-8'), offset + length
+
+
+def file_fingerprint(path):
+    st = os.stat(path)
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return st.st_mtime_ns, st.st_size, h.digest()
+
+
+def encode_graph(graph):
+    # dictionary encoding: every distinct term gets an integer id, and the
+    # triples become a flat array of ids
+    ids = {}
+    terms = []
+    triples = array('I')
+
+    for triple in graph:
+        for term in triple:
+            term_id = ids.get(term)
+            if term_id is None:
+                term_id = ids[term] = len(terms)
+                terms.append(encode_term(term))
+            triples.append(term_id)
+
+    return terms, triples
+
+
+def insert_encoded(graph, terms, triples):
+    # adds triples encoded by encode_graph to graph in one addN
+    terms = [decode_term(kind, value, extra) for kind, value, extra in terms]
+    it = iter(triples)
+    graph.addN((terms[s], terms[p], terms[o], graph) for s, p, o in zip(it, it, it))
+    return len(triples) // 3
+
+
+def write_snapshot(graph, snapshot_file, source_file=None):
+    terms, triples = encode_graph(graph)
+    namespaces = [(prefix, str(ns)) for prefix, ns in graph.namespaces()]
+
+    fingerprint = file_fingerprint(source_file) if source_file else (0, 0, b"\0" * 32)
+
+    return write_encoded_snapshot(terms, triples, namespaces, snapshot_file, fingerprint)
+
+
+def write_encoded_snapshot(terms, triples, namespaces, snapshot_file, fingerprint=(0, 0, b"\0" * 32), sync=False):
+    # with sync, the file is on disk when this returns (used for checkpoints)
+    mtime, size, digest = fingerprint
+
+    if sys.byteorder != "little":
+        triples = array('I', triples)
+        triples.byteswap()
+
+    tmp_file = snapshot_file + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, mtime, size, digest, len(namespaces), len(terms), len(triples) // 3))
+
+        for prefix, ns in namespaces:
+            _write_string(f, prefix)
+            _write_string(f, ns)
+
+        for kind, value, extra in terms:
+            f.write(kind)
+            _write_string(f, value)
+            if extra is not None:
+                _write_string(f, extra)
+
+        f.write(b"\0" * (-f.tell() % 4))
+        triples.tofile(f)
+
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+
+    os.replace(tmp_file, snapshot_file)
+
+    return len(triples) // 3
+
+
+def _check_ids(snapshot_file, ids, term_count):
+    if len(ids) and max(ids) >= term_count:
+        raise ValueError(f"Corrupt snapshot file '{snapshot_file}': term id out of range")
+
+
+def read_snapshot(snapshot_file, graph):
+    with open(snapshot_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"Empty snapshot file '{snapshot_file}'")
+
+        # every view of the map is released on the way out, also when the
+        # file is corrupt: the map cannot be closed while one is alive
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as buf:
+            magic, _mtime, _size, _digest, ns_count, term_count, triple_count = HEADER.unpack_from(buf, 0)
+            if magic != MAGIC:
+                raise ValueError(f"'{snapshot_file}' is not a graph snapshot")
+            offset = HEADER.size
+
+            for _ in range(ns_count):
+                prefix, offset = _read_string(buf, offset)
+                ns, offset = _read_string(buf, offset)
+                graph.bind(prefix, ns)
+
+            terms = []
+            for _ in range(term_count):
+                kind = bytes(buf[offset:offset + 1])
+                value, offset = _read_string(buf, offset + 1)
+                extra = None
+                if kind in (TYPED, TAGGED):
+                    extra, offset = _read_string(buf, offset)
+                terms.append((kind, value, extra))
+
+            offset += -offset % 4
+            with buf[offset:offset + triple_count * 12] as raw:
+                # checked before adding anything, so a corrupt file leaves
+                # no triples behind
+                if len(raw) != triple_count * 12:
+                    raise ValueError(f"Truncated snapshot file '{snapshot_file}'")
+                if sys.byteorder == "little":
+                    # the id array is used straight from the mapped file
+                    with raw.cast('I') as ids:
+                        _check_ids(snapshot_file, ids, term_count)
+                        insert_encoded(graph, terms, ids)
+                else:
+                    ids = array('I', bytes(raw))
+                    ids.byteswap()
+                    _check_ids(snapshot_file, ids, term_count)
+                    insert_encoded(graph, terms, ids)
+
+    return triple_count
+
+
+def snapshot_is_fresh(snapshot_file, source_file):
+    if not os.path.exists(snapshot_file):
+        return False
+
+    with open(snapshot_file, 'rb') as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return False
+
+    magic, mtime, size, digest, *_ = HEADER.unpack(header)
+    if magic != MAGIC:
+        return False
+
+    st = os.stat(source_file)
+    if st.st_mtime_ns == mtime and st.st_size == size:
+        return True
+
+    # touched but maybe not changed: compare contents before rebuilding
+    _, _, current = file_fingerprint(source_file)
+    if current != digest:
+        return False
+
+    with open(snapshot_file, 'r+b') as f:
+        f.seek(MTIME_OFFSET)
+        f.write(struct.pack("<q", st.st_mtime_ns))
+    return True
+
+
+def rdf_format(path):
+    return 'nt' if path.endswith('.nt') else 'turtle'
+
+
+def build_snapshot(source_file, snapshot_file=None):
+    snapshot_file = snapshot_file or source_file + SNAPSHOT_SUFFIX
+
+    g = Graph()
+    g.parse(source_file, format=rdf_format(source_file))
+    write_snapshot(g, snapshot_file, source_file)
+
+    return g, snapshot_file
+
+
+def load_with_snapshot(graph, source_file):
+    # loads source_file through its snapshot, (re)building the snapshot
+    # first when it is missing or the source changed since it was written
+    snapshot_file = source_file + SNAPSHOT_SUFFIX
+
+    if snapshot_is_fresh(snapshot_file, source_file):
+        try:
+            return read_snapshot(snapshot_file, graph)
+        except Exception as e:
+            Logger.error(f"Snapshot '{snapshot_file}' is unreadable ({e}), rebuilding it from the source")
+
+    Logger.log(f"Building snapshot '{snapshot_file}'...")
+    g, _ = build_snapshot(source_file, snapshot_file)
+    for prefix, ns in g.namespaces():
+        graph.bind(prefix, ns)
+    graph += g
+
+    return len(g)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        Logger.error("Usage: python snapshot.py <input_file.ttl> [output_file.snap]")
+        sys.exit(1)
+
+    source_file = sys.argv[1]
+    snapshot_file = sys.argv[2] if len(sys.argv) == 3 else None
+
+    try:
+        g, snapshot_file = build_snapshot(source_file, snapshot_file)
+    except Exception as e:
+        Logger.error(f"Failed to build snapshot of '{source_file}': {e}")
+        sys.exit(1)
+
+    Logger.log(f"Snapshot of '{source_file}' with {len(g)} triples written to {snapshot_file}.")
@@ -0,0 +1,263 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from rdflib import URIRef
+from rdflib.store import Store, VALID_STORE
+
+from snapshot import encode_term, decode_term
+
+
+TERM_CACHE_SIZE = 100_000
+WRITE_BATCH_SIZE = 10_000
+FETCH_SIZE = 1_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    extra TEXT NOT NULL DEFAULT '',
+    UNIQUE (kind, value, extra)
+);
+
+CREATE TABLE IF NOT EXISTS triples (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+
+-- (s, p, o) serves subject lookups; the operations look interfaces up by
+-- predicate and value (if:name, if:enabled, if:oper-status, ip:interface,
+-- ip:network-start/end), which is what (p, o, s) covers
+CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);
+CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p);
+
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    uri TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class _LRU(OrderedDict):
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def get(self, key):
+        value = super().get(key)
+        if value is not None:
+            self.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        if len(self) > self.size:
+            self.popitem(last=False)
+
+
+class SQLiteStore(Store):
+    # File-backed rdflib store: terms are dictionary-encoded in one table and
+    # triples are rows of term ids. Only a bounded cache of terms is kept in
+    # memory, and reopening an existing file needs no parsing at all.
+    # Writes are batched and only become durable on commit().
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = True
+    graph_aware = False
+
+    # lookups by (predicate, object), like an interface by if:name or the
+    # address nodes pointing at it, are answered from the SQLite indexes, so
+    # the operations need no in-memory index of their own over this store
+    indexed_lookups = True
+
+    def __init__(self, configuration=None, identifier=None):
+        super().__init__(configuration, identifier)
+        self._conn = None
+        self._lock = threading.RLock()
+        self._ids = _LRU(TERM_CACHE_SIZE)
+        self._terms = _LRU(TERM_CACHE_SIZE)
+        self._pending = []
+
+    def open(self, configuration, create=True):
+        self._conn = sqlite3.connect(configuration, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction=False):
+        if self._conn is None:
+            return
+        if commit_pending_transaction:
+            self.commit()
+        else:
+            self._pending.clear()
+        self._conn.close()
+        self._conn = None
+
+    def commit(self):
+        with self._lock:
+            self._flush()
+            self._conn.commit()
+
+    def rollback(self):
+        with self._lock:
+            self._pending.clear()
+            self._conn.rollback()
+            self._ids.clear()
+            self._terms.clear()
+
+    # terms
+
+    def _term_id(self, term, create=False):
+        term_id = self._ids.get(term)
+        if term_id is not None:
+            return term_id
+
+        kind, value, extra = encode_term(term)
+        kind = kind.decode()
+        extra = extra or ''
+
+        row = self._conn.execute(
+            "SELECT id FROM terms WHERE kind = ? AND value = ? AND extra = ?", (kind, value, extra)).fetchone()
+        if row:
+            term_id = row[0]
+        elif create:
+            term_id = self._conn.execute(
+                "INSERT INTO terms (kind, value, extra) VALUES (?, ?, ?)", (kind, value, extra)).lastrowid
+        else:
+            return None
+
+        self._ids.put(term, term_id)
+        return term_id
+
+    def _term(self, term_id):
+        term = self._terms.get(term_id)
+        if term is None:
+            kind, value, extra = self._conn.execute(
+                "SELECT kind, value, extra FROM terms WHERE id = ?", (term_id,)).fetchone()
+            term = decode_term(kind.encode(), value, extra or None)
+            self._terms.put(term_id, term)
+        return term
+
+    # triples
+
+    def _flush(self):
+        if self._pending:
+            self._conn.executemany("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", self._pending)
+            self._pending.clear()
+
+    def add(self, triple, context, quoted=False):
+        with self._lock:
+            self._pending.append(tuple(self._term_id(term, create=True) for term in triple))
+            if len(self._pending) >= WRITE_BATCH_SIZE:
+                self._flush()
+        Store.add(self, triple, context, quoted)
+
+    def addN(self, quads):
+        for s, p, o, c in quads:
+            self.add((s, p, o), c)
+
+    def _where(self, pattern):
+        clauses, params = [], []
+        for column, term in zip(("s", "p", "o"), pattern):
+            if term is None:
+                continue
+            term_id = self._term_id(term)
+            if term_id is None:
+                # a term the store has never seen matches nothing
+                return None, None
+            clauses.append(f"{column} = ?")
+            params.append(term_id)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def remove(self, triple_pattern, context=None):
+        with self._lock:
+            self._flush()
+            where, params = self._where(triple_pattern)
+            if where is None:
+                return
+            self._conn.execute("DELETE FROM triples" + where, params)
+        Store.remove(self, triple_pattern, context)
+
+    def triples(self, triple_pattern, context=None):
+        with self._lock:
+            self._flush()
+            where, params = self._where(triple_pattern)
+            if where is None:
+                return
+            cursor = self._conn.execute("SELECT s, p, o FROM triples" + where, params)
+
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                batch = [(self._term(s), self._term(p), self._term(o)) for s, p, o in rows]
+            for triple in batch:
+                yield triple, iter(())
+
+    def __len__(self, context=None):
+        with self._lock:
+            self._flush()
+            return self._conn.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def count(self, triple_pattern):
+        # number of triples matching the pattern, counted in SQLite
+        with self._lock:
+            self._flush()
+            where, params = self._where(triple_pattern)
+            if where is None:
+                return 0
+            return self._conn.execute("SELECT COUNT(*) FROM triples" + where, params).fetchone()[0]
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # namespaces
+
+    def bind(self, prefix, namespace, override=True):
+        with self._lock:
+            row = self._conn.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+            if row and not override:
+                return
+            self._conn.execute("DELETE FROM namespaces WHERE uri = ?", (str(namespace),))
+            self._conn.execute("INSERT OR REPLACE INTO namespaces (prefix, uri) VALUES (?, ?)", (prefix, str(namespace)))
+
+    def namespace(self, prefix):
+        with self._lock:
+            row = self._conn.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace):
+        with self._lock:
+            row = self._conn.execute("SELECT prefix FROM namespaces WHERE uri = ?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT prefix, uri FROM namespaces").fetchall()
+        for prefix, uri in rows:
+            yield prefix, URIRef(uri)
+
+    # bookkeeping for the executor
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
@@ -1,27 +1,112 @@
-from rdflib import Literal, URIRef
-from rdflib.namespace import RDF
+from rdflib import Literal
+from rdflib.plugins.sparql.processor import prepareUpdate
 
-def status_up(graph, interface_name):    
-    query = """
-    DELETE WHERE {
-        inst:%s if:oper-status "down" .
-    } ;
-    INSERT DATA {
-        inst:%s if:oper-status "up" .
-    }
-    """ % (interface_name, interface_name)
+from namespaces import NAMESPACES, IF
+from index import resolve_interface
+from inconsistencies import enabled_triples
+from metrics import timed, phase
 
-    graph.update(query)
 
+STATUS_UP = prepareUpdate("""
+    DELETE WHERE {
+        ?interface if:oper-status "down" .
+    } ;
+    INSERT {
+        ?interface if:oper-status "up" .
+    } WHERE {}
+    """, initNs=NAMESPACES)
 
-def status_down(graph, interface_name):    
-    query = """
+STATUS_DOWN = prepareUpdate("""
     DELETE WHERE {
-        inst:%s if:oper-status "up" .
+        ?interface if:oper-status "up" .
     } ;
-    INSERT DATA {
-        inst:%s if:oper-status "down" .
-    }
-    """ % (interface_name, interface_name)
+    INSERT {
+        ?interface if:oper-status "down" .
+    } WHERE {}
+    """, initNs=NAMESPACES)
+
+
+@timed(size=None)
+def status_up(graph, interface_name):
+    with phase("resolve"):
+        interface = resolve_interface(graph, interface_name)
+    if interface is None:
+        return False
+
+    with phase("update"):
+        graph.update(STATUS_UP, initBindings={"interface": interface})
+    return True
+
+
+@timed(size=None)
+def status_down(graph, interface_name):
+    with phase("resolve"):
+        interface = resolve_interface(graph, interface_name)
+    if interface is None:
+        return False
+
+    with phase("update"):
+        graph.update(STATUS_DOWN, initBindings={"interface": interface})
+    return True
+
+
+OPER_STATUS = IF["oper-status"]
+OPER_STATUS_VALUES = {"up": Literal("up"), "down": Literal("down")}
+
+
+def oper_status_triples(interface, value):
+    # (removed, added) triples that set if:oper-status, like STATUS_UP/DOWN
+    if not isinstance(value, str) or value not in OPER_STATUS_VALUES:
+        raise ValueError(f"Invalid oper-status value: {value}")
+    opposite = "down" if value == "up" else "up"
+
+    return [(interface, OPER_STATUS, OPER_STATUS_VALUES[opposite])], [(interface, OPER_STATUS, OPER_STATUS_VALUES[value])]
+
+
+FIELDS = {
+    "oper-status": oper_status_triples,
+    "enabled": enabled_triples,
+}
+
+
+@timed()
+def bulk_update(graph, changes):
+    # applies a batch of (interface name, field, value) changes with direct
+    # triple removal/addition, in order, without parsing an update per item;
+    # returns one {"interface", "field", "value", "ok"[, "error"]} per change.
+    # The caller commits once for the whole batch. A malformed item (e.g.
+    # JSON values of the wrong type) only fails itself.
+    results = []
+    for interface_name, field, value in changes:
+        result = {"interface": interface_name, "field": field, "value": value, "ok": False}
+        results.append(result)
+        try:
+            _apply_change(graph, interface_name, field, value, result)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+
+    return results
+
+
+def _apply_change(graph, interface_name, field, value, result):
+    triples = FIELDS.get(field) if isinstance(field, str) else None
+    if triples is None:
+        result["error"] = f"Unknown field: {field}"
+        return
+
+    interface = resolve_interface(graph, interface_name) if isinstance(interface_name, str) else None
+    if interface is None:
+        result["error"] = f"Interface '{interface_name}' not found."
+        return
+
+    try:
+        removed, added = triples(interface, value)
+    except ValueError as e:
+        result["error"] = str(e)
+        return
 
-    graph.update(query)
\ No newline at end of file
+    for triple in removed:
+        graph.remove(triple)
+    for triple in added:
+        graph.add(triple)
+    result["ok"] = True
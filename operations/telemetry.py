@@ -0,0 +1,292 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+
+from logger import Logger
+from status import bulk_update
+
+
+QUEUE_SIZE = 10_000
+BATCH_WINDOW = 0.05   # seconds events are coalesced for before a batch is applied
+MAX_BATCH = 10_000
+POLL_INTERVAL = 0.1   # seconds between reads of a file that has no new lines
+
+FIELDS = ("oper-status", "enabled")
+
+
+class IngestStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.received = 0
+        self.malformed = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.applied = 0
+        self.failed = 0
+        self.failed_batches = 0
+        self.queued = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+
+    def snapshot(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "received": self.received,
+            "malformed": self.malformed,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "applied": self.applied,
+            "failed": self.failed,
+            "failed-batches": self.failed_batches,
+            "queued": self.queued,
+            "events-per-second": round(self.received / elapsed, 1),
+            "changes-per-second": round(self.applied / elapsed, 1),
+            "lag-seconds": round(self.lag, 4),
+            "max-lag-seconds": round(self.max_lag, 4),
+        }
+
+
+def parse_event(line):
+    # {"interface": name, "oper-status": "up"|"down", "enabled": bool}; either
+    # field may be missing, but not both
+    event = json.loads(line)
+    if not isinstance(event, dict) or not isinstance(event.get("interface"), str) \
+            or not any(field in event for field in FIELDS):
+        raise ValueError(f"Not a telemetry event: {line.strip()}")
+    return event
+
+
+class TelemetryIngestor:
+    # Tails a JSON-lines file or listens on a UNIX socket for oper-status/
+    # enabled events and applies them to the graph in micro-batches, from an
+    # asyncio loop on its own thread:
+    #
+    #   source --> bounded queue --> batcher (coalesce per interface) --> bulk_update
+    #
+    # The queue is bounded, so a slow graph makes the sources wait (the file is
+    # read more slowly, socket clients stop being read) instead of buffering
+    # without limit. Batches are applied off the loop, holding the graph's
+    # write lock.
+
+    def __init__(self, graph, source, path, window=BATCH_WINDOW, max_batch=MAX_BATCH, queue_size=QUEUE_SIZE):
+        if source not in ("file", "unix"):
+            raise ValueError(f"Unknown telemetry source: {source}")
+        self.graph = graph
+        self.source = source
+        self.path = path
+        self.window = window
+        self.max_batch = max_batch
+        self.queue_size = queue_size
+        self.stats = IngestStats()
+        self._loop = None
+        self._thread = None
+        self._stopping = None
+        self._applying = None   # the batch being applied on a worker thread
+
+    # sources
+
+    async def _put(self, queue, line, received):
+        try:
+            event = parse_event(line)
+        except ValueError:
+            self.stats.malformed += 1
+            return
+        self.stats.received += 1
+        await queue.put((event, received))
+        self.stats.queued = queue.qsize()
+
+    async def _tail_file(self, queue):
+        # follows the file from its current end, like tail -f
+        with open(self.path, "a+", encoding="utf-8") as f:
+            f.seek(0, 2)
+            partial = ""
+            while not self._stopping.is_set():
+                line = f.readline()
+                if not line:
+                    await asyncio.sleep(POLL_INTERVAL)
+                    continue
+                if not line.endswith("\n"):
+                    partial += line
+                    continue
+                await self._put(queue, partial + line, time.monotonic())
+                partial = ""
+
+    async def _serve_socket(self, queue):
+        async def client(reader, writer):
+            try:
+                while line := await reader.readline():
+                    await self._put(queue, line.decode("utf-8"), time.monotonic())
+            finally:
+                writer.close()
+
+        server = await asyncio.start_unix_server(client, path=self.path)
+        try:
+            async with server:
+                await self._stopping.wait()
+        finally:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    # batches
+
+    def _apply(self, changes):
+        with self.graph.lock.write():
+            results = bulk_update(self.graph, changes)
+            self.graph.commit()
+        return results
+
+    async def _batches(self, queue):
+        while True:
+            event, received = await queue.get()
+            oldest = received
+            pending = {}
+            count = 0
+            deadline = time.monotonic() + self.window
+
+            # gather what arrives inside the window, keeping only the latest
+            # value of each field per interface
+            while True:
+                count += 1
+                fields = pending.setdefault(event["interface"], {})
+                for field in FIELDS:
+                    if field in event:
+                        fields[field] = event[field]
+                if count >= self.max_batch:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    event, received = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            changes = [(name, field, value) for name, fields in pending.items() for field, value in fields.items()]
+            self.stats.coalesced += count - len(pending)
+            self.stats.queued = queue.qsize()
+
+            # shielded, so stopping waits for a batch already being applied
+            # (and its commit) instead of abandoning it on the worker thread
+            self._applying = asyncio.ensure_future(asyncio.to_thread(self._apply, changes))
+            try:
+                results = await asyncio.shield(self._applying)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # a bad batch is counted and dropped; ingestion goes on
+                Logger.error(f"Failed to apply a telemetry batch of {len(changes)} changes: {e}")
+                self.stats.failed_batches += 1
+                self.stats.failed += len(changes)
+                continue
+            finally:
+                if self._applying.done():
+                    self._applying = None
+
+            applied = sum(r["ok"] for r in results)
+            self.stats.batches += 1
+            self.stats.applied += applied
+            self.stats.failed += len(results) - applied
+            self.stats.lag = time.monotonic() - oldest
+            self.stats.max_lag = max(self.stats.max_lag, self.stats.lag)
+
+    async def _run(self):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        source = self._tail_file(queue) if self.source == "file" else self._serve_socket(queue)
+
+        tasks = [asyncio.create_task(source), asyncio.create_task(self._batches(queue))]
+        stop = asyncio.create_task(self._stopping.wait())
+
+        done, _ = await asyncio.wait([stop, *tasks], return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task is not stop and task.exception() is not None:
+                Logger.error(f"Telemetry ingestion from '{self.path}' stopped: {task.exception()}")
+
+        for task in (stop, *tasks):
+            task.cancel()
+        await asyncio.gather(stop, *tasks, return_exceptions=True)
+        if self._applying is not None:
+            await asyncio.gather(self._applying, return_exceptions=True)
+        await asyncio.get_running_loop().shutdown_default_executor()
+
+    def start(self):
+        self._stopping = asyncio.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._run(),), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._loop is not None and self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread is not None:
+            self._thread.join()
+            self._loop.close()
+
+
+_running = {}
+
+
+def start_ingest(graph, spec):
+    # spec is "file:<path>" or "unix:<socket path>"
+    source, _, path = spec.partition(":")
+    if not path:
+        raise ValueError(f"Expected file:<path> or unix:<path>, got '{spec}'")
+
+    ingestor = TelemetryIngestor(graph, source, path)
+    ingestor.start()
+    _running[id(graph)] = ingestor
+    return ingestor
+
+
+def running_ingestor(graph):
+    return _running.get(id(graph))
+
+
+def stop_ingest(graph):
+    ingestor = _running.pop(id(graph), None)
+    if ingestor is not None:
+        ingestor.stop()
+
+
+# writers standing in for a real telemetry source
+
+def write_events(path, events):
+    with open(path, "a", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def send_events(path, events):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(path)
+        s.sendall("".join(json.dumps(event) + "\n" for event in events).encode("utf-8"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="python telemetry.py <events_file|socket_path> [--socket] < events.jsonl")
+    parser.add_argument("target")
+    parser.add_argument("--socket", action="store_true", help="send to the UNIX socket at target instead of appending to a file")
+    args = parser.parse_args()
+
+    events = []
+    for line in sys.stdin:
+        if line.strip():
+            try:
+                events.append(parse_event(line))
+            except ValueError as e:
+                Logger.error(str(e))
+                sys.exit(1)
+
+    try:
+        (send_events if args.socket else write_events)(args.target, events)
+    except OSError as e:
+        Logger.error(f"Failed to write events to '{args.target}': {e}")
+        sys.exit(1)
+
+    Logger.log(f"{len(events)} events written to '{args.target}'.")
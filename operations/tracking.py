@@ -0,0 +1,113 @@
+import threading
+
+from rdflib import Graph
+
+from rwlock import RWLock
+
+
+class TrackedGraph(Graph):
+    # Graph that reports every triple actually added or removed, whichever
+    # path the change takes (SPARQL update, patch, direct add/remove), to the
+    # structures attached to it, so they stay in sync without rescanning.
+    # Listeners implement triple_added(triple) and triple_removed(triple),
+    # and optionally committed(), called on every commit before the store's.
+    # Code sharing the graph between threads holds `lock` around each
+    # operation: lock.read() for queries, lock.write() for changes.
+    # `version` grows with every change, so results computed from the graph
+    # can be told apart from stale ones.
+
+    # wraps the iterator of every triples() call when set (metrics.enable()
+    # counts the triples scanned with it)
+    scan_hook = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._listeners = []
+        self._attached = {}
+        self.lock = RWLock()
+        self._attach_lock = threading.RLock()   # factories may attach what they use
+        self.version = 0
+
+    def attach(self, factory):
+        # one instance per factory, built from the current graph on first use
+        listener = self._attached.get(factory)
+        if listener is None:
+            with self._attach_lock:
+                listener = self._attached.get(factory)
+                if listener is None:
+                    listener = self._attached[factory] = factory(self)
+                    self._listeners.append(listener)
+        return listener
+
+    def triples(self, triple):
+        hook = TrackedGraph.scan_hook
+        if hook is None:
+            return super().triples(triple)
+        return hook(super().triples(triple))
+
+    def add(self, triple):
+        if not self._listeners:
+            self.version += 1
+            return super().add(triple)
+
+        if triple not in self:
+            super().add(triple)
+            self.version += 1
+            for listener in self._listeners:
+                listener.triple_added(triple)
+        return self
+
+    def addN(self, quads):
+        if not self._listeners:
+            self.version += 1
+            return super().addN(quads)
+
+        added, seen = [], set()
+        for s, p, o, c in quads:
+            triple = (s, p, o)
+            if isinstance(c, Graph) and c.identifier == self.identifier \
+                    and triple not in seen and triple not in self:
+                seen.add(triple)
+                added.append(triple)
+        super().addN((s, p, o, self) for s, p, o in added)
+        if added:
+            self.version += 1
+        for triple in added:
+            for listener in self._listeners:
+                listener.triple_added(triple)
+        return self
+
+    def remove(self, triple):
+        if not self._listeners:
+            self.version += 1
+            return super().remove(triple)
+
+        # the argument may be a pattern, so collect what it matches first
+        if None in triple:
+            removed = list(self.triples(triple))
+        elif triple in self:
+            removed = [triple]
+        else:
+            return self
+        super().remove(triple)
+        if removed:
+            self.version += 1
+        for t in removed:
+            for listener in self._listeners:
+                listener.triple_removed(t)
+        return self
+
+    def commit(self):
+        for listener in self._listeners:
+            committed = getattr(listener, "committed", None)
+            if committed is not None:
+                committed()
+        return super().commit()
+
+
+def attached(graph, factory):
+    # structures kept in sync by a TrackedGraph; a plain Graph gets a fresh,
+    # unmaintained instance on every call
+    if isinstance(graph, TrackedGraph):
+        return graph.attach(factory)
+    return factory(graph)
@@ -0,0 +1,282 @@
+import os
+import re
+import time
+import threading
+
+from rdflib import Graph
+
+from logger import Logger
+from snapshot import encode_graph, write_encoded_snapshot, read_snapshot
+from patch import nt_row
+
+
+SYNC_INTERVAL = 0.05           # seconds between the group fsyncs of the log (0: fsync every commit)
+CHECKPOINT_INTERVAL = 300      # seconds after which a log with changes is checkpointed
+CHECKPOINT_BYTES = 16 << 20    # log size that triggers a checkpoint sooner
+CHECK_PERIOD = 1.0             # seconds between checks of the two limits above
+
+# A WAL directory holds checkpoint-<n>.snap, a snapshot of the graph with every
+# change logged in the segments before n, and the segments wal-<m>.patch
+# (m >= n) logged since, replayed on top of it in order
+CHECKPOINT = "checkpoint-{:08d}.snap"
+SEGMENT = "wal-{:08d}.patch"
+FILE_NAME = re.compile(r"(checkpoint|wal)-(\d{8})\.(snap|patch)$")
+
+
+def _files(directory):
+    checkpoints, segments = [], []
+    for name in os.listdir(directory):
+        match = FILE_NAME.match(name)
+        if match:
+            (checkpoints if match.group(1) == "checkpoint" else segments).append(int(match.group(2)))
+    return sorted(checkpoints), sorted(segments)
+
+
+def _sync_directory(directory):
+    # makes created, renamed and deleted files durable
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_segment(segment_file, changes):
+    # records the last operation ("A" or "D") on every triple of the segment's
+    # committed transactions in changes; a transaction cut short by a crash
+    # (no TC, or a torn last line) is dropped
+    transaction = None
+    with open(segment_file, encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            op, _, triple = line.rstrip("\n").partition(" ")
+            if op == "TX":
+                transaction = {}
+            elif op == "TC":
+                if transaction:
+                    changes.update(transaction)
+                transaction = None
+            elif op == "TA":
+                transaction = None
+            elif op in ("A", "D") and transaction is not None:
+                transaction[triple] = op
+    return changes
+
+
+def recover(graph, directory):
+    # loads the last checkpoint in directory and replays the log written
+    # since; returns (checkpoint number, triples changed by the replay), or
+    # None when there is no checkpoint yet
+    checkpoints, segments = _files(directory)
+    if not checkpoints:
+        return None
+
+    number = checkpoints[-1]
+    read_snapshot(os.path.join(directory, CHECKPOINT.format(number)), graph)
+
+    # every change only sets whether a triple is in the graph, so only the
+    # last one on each triple matters and the replay is two bulk updates
+    changes = {}
+    for segment in segments:
+        if segment >= number:
+            read_segment(os.path.join(directory, SEGMENT.format(segment)), changes)
+
+    removed = Graph().parse(data="\n".join(t for t, op in changes.items() if op == "D"), format="nt")
+    added = Graph().parse(data="\n".join(t for t, op in changes.items() if op == "A"), format="nt")
+    for triple in removed:
+        graph.remove(triple)
+    graph.addN((s, p, o, graph) for s, p, o in added)
+
+    return number, len(changes)
+
+
+class WriteAheadLog:
+    # TrackedGraph listener appending the changes of every commit to the log
+    # as one RDF Patch transaction (TX, A/D lines, TC). A commit only hands
+    # its transaction to the OS; a background thread fsyncs everything
+    # written since its last pass at once (group commit), so a crash loses at
+    # most the last sync_interval of changes. A second thread checkpoints:
+    # it writes the graph as a new snapshot and deletes the log segments the
+    # snapshot covers, which keeps both the log and the replay short.
+
+    def __init__(self, graph, directory, sync_interval=SYNC_INTERVAL,
+                 checkpoint_interval=CHECKPOINT_INTERVAL, checkpoint_bytes=CHECKPOINT_BYTES):
+        self.graph = graph
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_bytes = checkpoint_bytes
+
+        self._pending = []                        # lines of the transaction not committed yet
+        self._lock = threading.Lock()             # the open segment and its counters
+        self._checkpointing = threading.Lock()
+        self._closing = threading.Event()
+        self._dirty = False
+        self._written = 0
+        self._last_checkpoint = time.monotonic()
+        self.commits = 0
+        self.syncs = 0
+        self.checkpoints = 0
+
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".tmp"):
+                os.remove(os.path.join(directory, name))
+
+        checkpoints, segments = _files(directory)
+        if checkpoints:
+            # the segments replayed by recover() stay until the next
+            # checkpoint; new transactions go to a segment of their own
+            self._segment = max(checkpoints + segments) + 1
+        else:
+            # a new log starts from a checkpoint of the graph as loaded
+            self._segment = 0
+            self._write_checkpoint(*self._encode(), 0)
+        self._file = self._open(self._segment)
+
+        self._threads = [threading.Thread(target=self._checkpoint_loop, daemon=True)]
+        if sync_interval:
+            self._threads.append(threading.Thread(target=self._sync_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    # listener
+
+    def triple_added(self, triple):
+        self._pending.append("A " + nt_row(triple))
+
+    def triple_removed(self, triple):
+        self._pending.append("D " + nt_row(triple))
+
+    def committed(self):
+        if not self._pending:
+            return
+        data = "TX .\n" + "".join(self._pending) + "TC .\n"
+        self._pending = []
+        with self._lock:
+            self._file.write(data)
+            self._written += len(data)
+            self._dirty = True
+            self.commits += 1
+            if not self.sync_interval:
+                self._sync()
+
+    # segments
+
+    def _open(self, number):
+        f = open(os.path.join(self.directory, SEGMENT.format(number)), "a", encoding="utf-8")
+        _sync_directory(self.directory)
+        return f
+
+    def _sync(self):
+        # with self._lock held
+        if self._dirty:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+            self.syncs += 1
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def _sync_loop(self):
+        while not self._closing.wait(self.sync_interval):
+            try:
+                self.sync()
+            except OSError as e:
+                Logger.error(f"Failed to sync the write-ahead log in '{self.directory}': {e}")
+
+    # checkpoints
+
+    def _encode(self):
+        terms, triples = encode_graph(self.graph)
+        return terms, triples, [(prefix, str(ns)) for prefix, ns in self.graph.namespaces()]
+
+    def _write_checkpoint(self, terms, triples, namespaces, number):
+        write_encoded_snapshot(terms, triples, namespaces, os.path.join(self.directory, CHECKPOINT.format(number)), sync=True)
+        _sync_directory(self.directory)
+
+        # everything before the new checkpoint is in it
+        checkpoints, segments = _files(self.directory)
+        for old in checkpoints:
+            if old < number:
+                os.remove(os.path.join(self.directory, CHECKPOINT.format(old)))
+        for old in segments:
+            if old < number:
+                os.remove(os.path.join(self.directory, SEGMENT.format(old)))
+        _sync_directory(self.directory)
+
+    def checkpoint(self):
+        # the graph is encoded under its read lock, between two commits, and
+        # the snapshot written after releasing it; commits meanwhile go to
+        # the new segment, which the checkpoint does not cover
+        with self._checkpointing:
+            with self.graph.lock.read():
+                with self._lock:
+                    self._sync()
+                    self._file.close()
+                    self._segment += 1
+                    self._file = self._open(self._segment)
+                    self._written = 0
+                    number = self._segment
+                encoded = self._encode()
+
+            self._write_checkpoint(*encoded, number)
+            self._last_checkpoint = time.monotonic()
+            self.checkpoints += 1
+            return number
+
+    def _checkpoint_loop(self):
+        while not self._closing.wait(CHECK_PERIOD):
+            due = self._written >= self.checkpoint_bytes or \
+                (self._written and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval)
+            if due:
+                try:
+                    self.checkpoint()
+                except OSError as e:
+                    Logger.error(f"Failed to checkpoint the write-ahead log in '{self.directory}': {e}")
+
+    def stats(self):
+        return {
+            "directory": self.directory,
+            "segment": self._segment,
+            "segment-bytes": self._written,
+            "commits": self.commits,
+            "syncs": self.syncs,
+            "checkpoints": self.checkpoints,
+        }
+
+    def close(self):
+        self._closing.set()
+        for thread in self._threads:
+            thread.join()
+        self.committed()
+        with self._lock:
+            self._sync()
+            self._file.close()
+            # a segment nothing was logged to is not kept
+            if os.path.getsize(self._file.name) == 0:
+                os.remove(self._file.name)
+
+
+_running = {}
+
+
+def open_wal(graph, directory, **options):
+    # logs every later commit of graph (a TrackedGraph) to directory; call
+    # recover() first when the directory may already hold a log
+    wal = graph.attach(lambda g: WriteAheadLog(g, directory, **options))
+    _running[id(graph)] = wal
+    return wal
+
+
+def running_wal(graph):
+    return _running.get(id(graph))
+
+
+def close_wal(graph):
+    wal = _running.pop(id(graph), None)
+    if wal is not None:
+        wal.close()
@@ -0,0 +1,3 @@
+@echo off
+
+py benchmarks/run.py %*
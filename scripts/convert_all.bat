@@ -1,4 +1,3 @@
 @echo off
 
-py converter/yang2rdf.py yang/ietf-interfaces.yang rdf/ietf-interfaces.ttl
-py converter/yang2rdf.py yang/ietf-ip.yang rdf/ietf-ip.ttl
\ No newline at end of file
+py converter/batch.py yang -o rdf
\ No newline at end of file
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the operations, the generator and the converter import their siblings by
+# bare name, as when run as scripts from the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "operations"), os.path.join(ROOT, "instances"), os.path.join(ROOT, "converter")]
@@ -0,0 +1,83 @@
+import random
+
+from rdflib import Literal, RDF
+from rdflib.namespace import XSD
+
+from generate import generate_instances
+from namespaces import INST, IF, IP
+from tracking import TrackedGraph
+from conflicts import conflict_tracker, cross_check
+from inconsistencies import enable_interface, disable_interface, find_inconsistencies
+from status import status_up, status_down, bulk_update
+
+
+def add_address(graph, name, interface, start, end, family="ipv4"):
+    node = INST[name]
+    graph.add((node, RDF.type, IP[f"{family}-address"]))
+    graph.add((node, IP.interface, interface))
+    graph.add((node, IP["network-start"], Literal(start, datatype=XSD.integer)))
+    graph.add((node, IP["network-end"], Literal(end, datatype=XSD.integer)))
+    return node
+
+
+def assert_in_sync(graph):
+    # the tracker against a full recompute of inconsistencies, duplicates
+    # and overlaps
+    assert cross_check(graph) == []
+
+
+def test_tracker_follows_changes():
+    g = TrackedGraph()
+    g += generate_instances(150, 0.2, 0.3, rng=random.Random(5))
+    conflict_tracker(g)
+    assert_in_sync(g)
+
+    rng = random.Random(6)
+    names = [f"eth{i}" for i in range(150)]
+
+    for name in rng.sample(names, 20):
+        disable_interface(g, name)
+        assert_in_sync(g)
+    for name in rng.sample(names, 20):
+        enable_interface(g, name)
+        assert_in_sync(g)
+    for name in rng.sample(names, 10):
+        status_down(g, name)
+        status_up(g, name)
+    assert_in_sync(g)
+
+    # an interface loses its address, then gets one overlapping another
+    # network, then the range is moved off a CIDR boundary
+    victim = INST["eth7"]
+    for node in list(g.subjects(IP.interface, victim)):
+        g.remove((node, None, None))
+    enable_interface(g, "eth7")
+    assert_in_sync(g)
+
+    other = next(n for n in g.subjects(RDF.type, IP["ipv4-address"]) if g.value(n, IP["network-start"]) is not None)
+    start = int(g.value(other, IP["network-start"]))
+    node = add_address(g, "eth7_new", victim, start, start + 3)
+    assert_in_sync(g)
+    assert any("eth7" in (a["interface"], b["interface"]) for a, b in conflict_tracker(g).conflicts()[1])
+
+    g.set((node, IP["network-end"], Literal(start + 6, datatype=XSD.integer)))
+    assert_in_sync(g)
+
+    # the address stops being typed, then is removed entirely
+    g.remove((node, RDF.type, None))
+    assert_in_sync(g)
+    g.remove((node, None, None))
+    assert_in_sync(g)
+
+    bulk_update(g, [(name, "enabled", rng.choice(["true", "false"])) for name in rng.sample(names, 30)])
+    assert_in_sync(g)
+
+    # interfaces coming and going
+    g.add((INST["eth-new"], RDF.type, IF.Interface))
+    g.add((INST["eth-new"], IF.name, Literal("eth-new")))
+    g.add((INST["eth-new"], IF.enabled, Literal(True)))
+    assert_in_sync(g)
+    g.remove((INST["eth-new"], None, None))
+    assert_in_sync(g)
+
+    assert set(conflict_tracker(g).inconsistencies()) == set(find_inconsistencies(g))
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from generate import generate_instances, shard_rng, stream_instances
+
+
+GENERATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instances", "generate.py")
+
+
+@pytest.mark.parametrize("format", ["nt", "turtle"])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_streamed_output_matches_graph_output(tmp_path, seed, format):
+    output_file = str(tmp_path / f"streamed.{'nt' if format == 'nt' else 'ttl'}")
+    stream_instances(output_file, 50, 0.2, 0.2, format, shard_rng(seed, 0))
+
+    expected = generate_instances(50, 0.2, 0.2, shard_rng(seed, 0))
+    streamed = Graph().parse(output_file, format=format)
+
+    assert len(expected) > 0
+    assert isomorphic(streamed, expected)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_nt_output_is_ntriples(tmp_path, stream):
+    output_file = str(tmp_path / "instances.nt")
+    subprocess.run([sys.executable, GENERATE, output_file, "30", "--seed", "7"] + (["--stream"] if stream else []),
+                   check=True, capture_output=True)
+
+    graph = Graph().parse(output_file, format="nt")
+    assert len(graph) > 0
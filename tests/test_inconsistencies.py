@@ -0,0 +1,47 @@
+import random
+
+import pytest
+from rdflib import Graph, Literal, RDF
+
+from generate import generate_instances
+from namespaces import INST, IF, IP
+from tracking import TrackedGraph
+from inconsistencies import find_inconsistencies, find_inconsistencies_native
+
+
+def add_interface(graph, name, enabled=True):
+    interface = INST[name]
+    graph.add((interface, RDF.type, IF.Interface))
+    graph.add((interface, IF.name, Literal(name)))
+    graph.add((interface, IF.enabled, Literal(enabled)))
+    graph.add((interface, IF["oper-status"], Literal("up")))
+    return interface
+
+
+@pytest.fixture(params=[Graph, TrackedGraph])
+def graph(request):
+    g = request.param()
+    g += generate_instances(200, 0.3, 0.1, rng=random.Random(7))
+
+    # consistent: an IPv6 address is enough
+    ipv6_only = add_interface(g, "ipv6-only")
+    g.add((INST["ipv6-only_ipv6"], RDF.type, IP["ipv6-address"]))
+    g.add((INST["ipv6-only_ipv6"], IP.ip, Literal("fe80::1")))
+    g.add((INST["ipv6-only_ipv6"], IP.interface, ipv6_only))
+
+    # inconsistent: the node pointing at it is not typed as an address
+    untyped = add_interface(g, "untyped-address")
+    g.add((INST["untyped-address_ipv4"], IP.ip, Literal("10.0.0.1")))
+    g.add((INST["untyped-address_ipv4"], IP.interface, untyped))
+    return g
+
+
+def test_native_matches_sparql(graph):
+    reference = set(find_inconsistencies(graph))
+    native = set(find_inconsistencies_native(graph))
+
+    assert native == reference
+    names = {str(name) for _, name in native}
+    assert "untyped-address" in names
+    assert "ipv6-only" not in names
+    assert len(names) > 2
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+from rdflib import Graph
+
+from generate import generate_instances
+from inconsistencies import get_all_networks, find_overlapping_prefixes
+
+
+def pairwise_overlaps(networks):
+    # the original O(n²) comparison, per address family
+    overlaps = []
+    for i in range(len(networks)):
+        for j in range(i + 1, len(networks)):
+            a, b = networks[i], networks[j]
+            if a["start"] is None or b["start"] is None or a["family"] != b["family"]:
+                continue
+            if a["start"] <= b["end"] and b["start"] <= a["end"]:
+                if not (a["start"] == b["start"] and a["end"] == b["end"]):
+                    overlaps.append((a, b))
+    return overlaps
+
+
+def random_networks(rng, count):
+    networks = []
+    for i in range(count):
+        family = rng.choice(["ipv4", "ipv6"])
+        if rng.random() < 0.05:
+            start = end = None
+        elif networks and rng.random() < 0.2:
+            # an exact duplicate of an earlier network
+            other = rng.choice([n for n in networks if n["family"] == family] or [None])
+            start, end = (other["start"], other["end"]) if other and other["start"] is not None else (0, 255)
+        else:
+            size = 1 << rng.randrange(0, 12)
+            start = rng.randrange(0, 1 << 14) // size * size
+            end = start + size - 1
+        networks.append({"interface": f"eth{i}", "family": family, "cidr": None, "start": start, "end": end})
+    return networks
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sweep_matches_pairwise(seed):
+    networks = random_networks(random.Random(seed), 300)
+    overlaps = find_overlapping_prefixes(networks)
+
+    assert overlaps
+    assert overlaps == pairwise_overlaps(networks)
+
+
+def test_sweep_matches_pairwise_on_generated_inventory():
+    g = Graph()
+    g += generate_instances(300, 0.1, 0.3, rng=random.Random(11))
+    networks = get_all_networks(g)
+
+    overlaps = find_overlapping_prefixes(networks)
+
+    assert overlaps
+    assert overlaps == pairwise_overlaps(networks)
@@ -0,0 +1,46 @@
+import os
+import shutil
+
+import pytest
+from rdflib import Graph
+
+from snapshot import HEADER, SNAPSHOT_SUFFIX, build_snapshot, load_with_snapshot
+
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rdf", "ietf-ip.ttl")
+
+
+def truncate(data):
+    return data[:-50]
+
+
+def bad_ids(data):
+    return data[:-4] + b"\xff\xff\xff\x7f"
+
+
+def bad_terms(data):
+    return data[:HEADER.size + 40] + b"\xfe" * 360 + data[HEADER.size + 400:]
+
+
+@pytest.mark.parametrize("corrupt", [truncate, bad_ids, bad_terms])
+def test_corrupt_snapshot_is_rebuilt(tmp_path, corrupt):
+    source_file = str(tmp_path / "schema.ttl")
+    shutil.copy(SCHEMA_FILE, source_file)
+    build_snapshot(source_file)
+
+    # the header still matches the source, only the body is damaged
+    snapshot_file = source_file + SNAPSHOT_SUFFIX
+    with open(snapshot_file, "rb") as f:
+        data = f.read()
+    with open(snapshot_file, "wb") as f:
+        f.write(corrupt(data))
+
+    expected = Graph().parse(source_file, format="turtle")
+    graph = Graph()
+    load_with_snapshot(graph, source_file)
+    assert set(graph) == set(expected)
+
+    # and the rebuilt snapshot is read back as is
+    graph = Graph()
+    assert load_with_snapshot(graph, source_file) == len(expected)
+    assert set(graph) == set(expected)
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from yang2rdf import yang_to_rdf
+
+
+YANG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "yang")
+MODULES = sorted(name for name in os.listdir(YANG_DIR) if name.endswith(".yang"))
+
+
+@pytest.mark.parametrize("stream", ["nt", "turtle"])
+@pytest.mark.parametrize("module", MODULES)
+def test_streamed_output_matches_graph_output(tmp_path, module, stream):
+    yang_file = os.path.join(YANG_DIR, module)
+    yang_to_rdf(yang_file, str(tmp_path / "graph.ttl"))
+    yang_to_rdf(yang_file, str(tmp_path / f"streamed.{stream}"), stream=stream)
+
+    expected = Graph().parse(tmp_path / "graph.ttl", format="turtle")
+    streamed = Graph().parse(tmp_path / f"streamed.{stream}", format="nt" if stream == "nt" else "turtle")
+
+    assert len(expected) > 0
+    assert isomorphic(streamed, expected)